@@ -4,53 +4,84 @@ This module handles audio output using the built-in audio capabilities
 of the Raspberry Pi 5 for both simple tones and audio file playback.
 """
 import os
+import re
+import math
 import time
 import subprocess
 import threading
+import functools
+import contextlib
+import shlex
+import shutil
+import wave
+from collections import namedtuple, OrderedDict
 import numpy as np
 import pygame
 from pygame import mixer
 
+SAMPLE_RATE = 44100
+# Tones and the bundled sound effects are all mono, so a mono mixer halves the
+# data pushed through SDL and ALSA; mono output still plays on both speakers
+MIXER_CHANNELS = 1
+MIXER_BUFFER = 512  # ~12 ms at 44.1 kHz, keeps trigger-to-sound latency low
+
 # Initialize pygame mixer
 try:
     # Try to initialize with specific device settings for headphone output
-    pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=2048)
+    pygame.mixer.init(frequency=SAMPLE_RATE, size=-16, channels=MIXER_CHANNELS, buffer=MIXER_BUFFER)
     PYGAME_AVAILABLE = True
 except Exception as e:
     PYGAME_AVAILABLE = False
     print(f"Error initializing pygame mixer: {e}")
     print("Install pygame for audio playback: pip install pygame")
 
+# pyalsaaudio is optional; it lets us keep the ALSA device open between WAV playbacks
+try:
+    import alsaaudio
+    ALSAAUDIO_AVAILABLE = True
+except ImportError:
+    ALSAAUDIO_AVAILABLE = False
+
+# Numba is optional; when present the sine kernel is JIT-compiled to native (NEON) code
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# tinytag is optional; it reads an audio file's duration from its headers in-process
+try:
+    from tinytag import TinyTag
+    TINYTAG_AVAILABLE = True
+except ImportError:
+    TINYTAG_AVAILABLE = False
+
 # Configure system audio to use headphone jack
 def configure_audio_output():
-    """Configure system audio to use headphone jack"""
+    """Configure system audio to use headphone jack (skipped once ~/.asoundrc exists)"""
     try:
-        # Set the audio output to analog (headphone jack)
-        import subprocess
+        home_dir = os.path.expanduser("~")
+        asoundrc_path = os.path.join(home_dir, ".asoundrc")
+        
+        # An existing .asoundrc means this has already been done on a previous run
+        if os.path.exists(asoundrc_path):
+            print(f"Audio output already configured ({asoundrc_path} exists)")
+            return
+        
         print("Configuring audio output to use headphone jack...")
         
         # Based on the audio test results, we know the headphone jack is card 1
-        # Method 1: Using amixer to set the default audio device
+        # Method 1: Set the default audio device to card 1 (Headphones) and the
+        # volume to maximum in a single shell invocation
         try:
-            # Set the default audio device to card 1 (Headphones)
-            subprocess.run(["amixer", "cset", "numid=3", "1"], check=False)
-            print("Set default audio device to headphone jack")
+            subprocess.run(["sh", "-c", "amixer cset numid=3 1; amixer set Master 100%"], check=False)
+            print("Set default audio device to headphone jack and volume to maximum")
         except Exception as e:
             print(f"Method 1 failed: {e}")
-            
-        # Method 2: Set volume to maximum
-        try:
-            subprocess.run(["amixer", "set", "Master", "100%"], check=False)
-            print("Set volume to maximum")
-        except Exception as e:
-            print(f"Could not set volume: {e}")
         
-        # Method 3: Using specific ALSA configuration
+        # Method 2: Using specific ALSA configuration
         try:
             # Create an .asoundrc file to set the default device
-            home_dir = os.path.expanduser("~")
-            asoundrc_path = os.path.join(home_dir, ".asoundrc")
-            
             with open(asoundrc_path, "w") as f:
                 f.write("""pcm.!default {
     type hw
@@ -75,34 +106,583 @@ ctl.!default {
 # Run audio configuration
 configure_audio_output()
 
+PCM_DEVICE = "plughw:1,0"  # Headphone jack (card 1)
+PCM_PERIOD_SIZE = 1024
+AUDIO_EXTENSIONS = frozenset(('.wav', '.mp3', '.ogg'))
+STREAM_FORMAT = (SAMPLE_RATE, 1, 2)  # (rate, channels, sample width) fed to the long-lived aplay
+APLAY_PIPE_CHUNK = 65536  # Bytes written to aplay's stdin before handing off to the feeder thread
+TONE_BUFFER_SECONDS = 2  # Tones up to this long are generated into a reused buffer
+BLOCK_SIZE = 4096  # Samples per block in _generate; small enough to stay in L1 cache
+TONE_CACHE_SIZE = 64  # Number of tone Sounds kept for reuse by play_tone
+MUSIC_END_EVENT = pygame.USEREVENT + 7  # Posted by pygame.mixer.music when a track finishes
+
+if NUMBA_AVAILABLE:
+    from numba import prange
+    
+    # Explicit signature: compiled eagerly at import (or loaded from the on-disk
+    # cache on later runs) so the first alarm doesn't pay the compile cost
+    @njit("void(f8, f8, f8, i2[::1])", cache=True, fastmath=True, parallel=True)
+    def _synth_sine_i16(frequency, volume, sample_rate, out):
+        """Write a sine tone straight into a 16-bit buffer in one fused, multi-threaded pass."""
+        step = 2 * math.pi * frequency / sample_rate
+        scale = volume * 327.67  # volume/100 * 32767
+        for i in prange(out.shape[0]):
+            out[i] = np.int16(scale * math.sin(step * i))
+
+_sample_index_cache = np.empty(0, dtype=np.float32)
+
+def _sample_index(num_samples):
+    """
+    Return the float32 sample indices 0..num_samples-1 as a read-only view.
+    
+    One shared arange (at least 10 seconds long) is kept and sliced, so the
+    synth functions don't rebuild it on every call.
+    """
+    global _sample_index_cache
+    if _sample_index_cache.size < num_samples:
+        index = np.arange(max(num_samples, SAMPLE_RATE * 10), dtype=np.float32)
+        index.flags.writeable = False
+        _sample_index_cache = index
+    return _sample_index_cache[:num_samples]
+
+@functools.lru_cache(maxsize=None)
+def _tone_period(frequency, volume):
+    """
+    Build one period of a sine wave as 16-bit samples.
+
+    The result is cached so repeated tones (alarm beeps, melody notes)
+    reuse the same buffer instead of recomputing the sine.
+
+    Args:
+        frequency: Frequency in Hz
+        volume: Volume level (0-100)
+    """
+    period = max(1, int(round(SAMPLE_RATE / frequency)))
+    scale = volume * 327.67  # volume/100 * 32767
+    if NUMBA_AVAILABLE:
+        base = np.empty(period, dtype=np.int16)
+        _synth_sine_i16(SAMPLE_RATE / period, float(volume), float(SAMPLE_RATE), base)
+    else:
+        # Stay in float32 throughout so numpy can use its SIMD (NEON on the Pi 5) sin/multiply loops,
+        # and do the sin and scaling in place on the one scratch buffer
+        phase = _sample_index(period) * np.float32(2 * np.pi / period)
+        np.sin(phase, out=phase)
+        phase *= np.float32(scale)
+        base = phase.astype(np.int16)
+    # Shared between callers, so make sure nobody modifies it in place
+    base.flags.writeable = False
+    return base
+
+def _tone_samples(frequency, duration, volume):
+    """Return 16-bit samples for a sine tone of the given duration."""
+    num_samples = int(SAMPLE_RATE * duration)
+    if NUMBA_AVAILABLE:
+        return _fill_tone(np.empty(num_samples, dtype=np.int16), frequency, volume)
+    # np.resize cycles the cached period into a buffer of exactly the right length
+    return np.resize(_tone_period(frequency, volume), num_samples)
+
+def _fill_tone(out, frequency, volume):
+    """Fill an existing 16-bit buffer in place with a sine tone."""
+    if NUMBA_AVAILABLE:
+        _synth_sine_i16(float(frequency), float(volume), float(SAMPLE_RATE), out)
+        return out
+    
+    # Without Numba, repeat the cached period
+    base = _tone_period(frequency, volume)
+    period = len(base)
+    whole = len(out) - len(out) % period
+    # Broadcast the period across every whole repetition, then copy the partial tail
+    out[:whole].reshape(-1, period)[:] = base
+    out[whole:] = base[:len(out) - whole]
+    return out
+
+def _osc_sine(phase):
+    """Turn phase (in cycles) into a sine wave, in place."""
+    # Keep only the fractional cycle so float32 sin() gets a small, accurate argument
+    phase -= np.floor(phase)
+    phase *= np.float32(2 * np.pi)
+    np.sin(phase, out=phase)
+
+def _osc_square(phase):
+    """Turn phase (in cycles) into a square wave, in place."""
+    _osc_sine(phase)
+    np.sign(phase, out=phase)
+
+def _osc_triangle(phase):
+    """Turn phase (in cycles) into a triangle wave, in place: 2*|2*(x - round(x))| - 1."""
+    rounded = np.floor(phase + np.float32(0.5))
+    phase -= rounded
+    np.abs(phase, out=phase)
+    phase *= np.float32(4)
+    phase -= np.float32(1)
+
+# Waveform name -> in-place oscillator
+_OSCILLATORS = {
+    'sine': _osc_sine,
+    'square': _osc_square,
+    'triangle': _osc_triangle,
+}
+
+def _generate(waveform, frequency, duration, volume, out=None):
+    """
+    Generate a tone of any supported waveform as 16-bit samples.
+    
+    Works through the output in BLOCK_SIZE chunks using one reused float32
+    scratch block, so the float data never grows beyond the block.
+    
+    Args:
+        waveform: 'sine', 'square' or 'triangle'
+        frequency: Frequency in Hz
+        duration: Duration in seconds
+        volume: Volume level (0-100)
+        out: Optional int16 buffer to fill; its length overrides duration
+    """
+    oscillator = _OSCILLATORS[waveform]
+    if out is None:
+        out = np.empty(int(SAMPLE_RATE * duration), dtype=np.int16)
+    num_samples = len(out)
+    index = _sample_index(min(num_samples, BLOCK_SIZE))
+    cycles_per_sample = frequency / SAMPLE_RATE
+    step = np.float32(cycles_per_sample)
+    scale = np.float32(volume * 327.67)  # volume/100 * 32767
+    scratch = np.empty(BLOCK_SIZE, dtype=np.float32)
+    for start in range(0, num_samples, BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, num_samples)
+        block = scratch[:stop - start]
+        # Phase within the block in float32, plus the block's starting phase
+        # reduced mod 1 in float64, so precision doesn't degrade on long tones
+        np.multiply(index[:stop - start], step, out=block)
+        block += np.float32((start * cycles_per_sample) % 1.0)
+        oscillator(block)
+        block *= scale
+        out[start:stop] = block
+    return out
+
+def _melody_samples(notes, durations, volume=50, gap=0.05):
+    """
+    Render a whole melody as one 16-bit buffer.
+    
+    With Numba each note is synthesized directly into the output; otherwise
+    the whole melody goes through a single vectorized sin call.
+    
+    Each note is followed by `gap` seconds of silence. Notes with a frequency
+    of 0 or less are skipped, leaving just the gap.
+    """
+    freqs = np.asarray(notes, dtype=np.float32)
+    counts = (np.asarray(durations, dtype=np.float64) * SAMPLE_RATE).astype(np.int64)
+    counts[freqs <= 0] = 0
+    
+    # Interleave note and gap segments; gaps have frequency 0
+    seg_freqs = np.column_stack((freqs, np.zeros_like(freqs))).ravel()
+    seg_counts = np.column_stack((counts, np.full_like(counts, int(SAMPLE_RATE * gap)))).ravel()
+    seg_starts = np.cumsum(seg_counts) - seg_counts
+    
+    total = int(seg_counts.sum())
+    if NUMBA_AVAILABLE:
+        # Write each note straight into the final int16 buffer; no float temporaries
+        out = np.zeros(total, dtype=np.int16)
+        for frequency, start, count in zip(seg_freqs[::2], seg_starts[::2], seg_counts[::2]):
+            if count:
+                _synth_sine_i16(float(frequency), float(volume), float(SAMPLE_RATE),
+                                out[start:start + count])
+        return out
+    
+    # Phase restarts at 0 on every note: step per sample times the index within the segment
+    phase = _sample_index(total) - np.repeat(seg_starts.astype(np.float32), seg_counts)
+    phase *= np.repeat(seg_freqs * np.float32(2 * np.pi / SAMPLE_RATE), seg_counts)
+    # Gaps have a step of 0, so sin() already leaves them silent
+    np.sin(phase, out=phase)
+    phase *= np.float32(volume * 327.67)  # volume/100 * 32767
+    return phase.astype(np.int16)
+
+# The alarm always uses the same two square-wave beeps, so render one
+# high/low cycle once at import; square waves sound sharper and more urgent
+ALARM_CYCLE_SECONDS = 0.2
+_ALARM_SAMPLES = np.concatenate((_generate('square', 800, ALARM_CYCLE_SECONDS / 2, 70),
+                                 _generate('square', 600, ALARM_CYCLE_SECONDS / 2, 70)))
+_ALARM_SAMPLES.flags.writeable = False
+
+def _make_sound(audio_data):
+    """
+    Wrap mono 16-bit samples in a pygame Sound without an intermediate bytes copy.
+
+    The samples are handed to pygame through the buffer protocol. If the
+    mixer was opened in stereo, the mono samples are duplicated into two
+    columns once so the array layout matches the mixer.
+    """
+    init = pygame.mixer.get_init()
+    channels = init[2] if init else 1
+    if channels == 2:
+        audio_data = np.column_stack((audio_data, audio_data))
+    return pygame.sndarray.make_sound(np.ascontiguousarray(audio_data))
+
+@functools.lru_cache(maxsize=32)
+def _load_wav(path, mtime_ns):
+    """
+    Read a WAV file's format and raw PCM frames.
+    
+    Cached per path; mtime_ns is part of the key so an edited file is re-read.
+    Returns ((rate, channels, sample width), frames).
+    """
+    with wave.open(path, 'rb') as w:
+        params = (w.getframerate(), w.getnchannels(), w.getsampwidth())
+        return params, w.readframes(w.getnframes())
+
+@functools.lru_cache(maxsize=128)
+def _read_duration(path, mtime_ns):
+    """
+    Work out an audio file's duration in seconds (None if it can't be determined).
+    
+    Cached per path; mtime_ns is part of the key so an edited file is re-read.
+    tinytag only parses the file headers. Without it, WAV lengths come from the
+    wave module and MP3 lengths from 'mpg123 --test' as before.
+    """
+    try:
+        if TINYTAG_AVAILABLE:
+            return TinyTag.get(path).duration
+        
+        ext = os.path.splitext(path)[1].lower()
+        if ext == '.wav':
+            with wave.open(path, 'rb') as w:
+                return w.getnframes() / w.getframerate()
+        if ext == '.mp3' and _which("mpg123"):
+            result = subprocess.run(["mpg123", "--skip", "0", "--test", path],
+                                    capture_output=True, text=True, check=False)
+            match = re.search(r'(\d+):(\d+)\.(\d+)', result.stderr)
+            if match:
+                mins, secs, hundredths = match.groups()
+                return int(mins) * 60 + int(secs) + int(hundredths) / 100
+    except Exception as e:
+        print(f"Error determining duration of {path}: {e}")
+    return None
+
+def get_audio_duration(path):
+    """
+    Return the duration of an audio file in seconds, or None if unknown.
+    
+    Args:
+        path: Path to the audio file
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    return _read_duration(path, mtime_ns)
+
+def preload_audio_durations(*directories):
+    """
+    Fill the duration cache for every audio file in the given directories.
+    
+    Runs on a background daemon thread so startup isn't delayed; afterwards
+    get_audio_duration() is a cache hit even for the first trigger of a file.
+    
+    Args:
+        directories: Directories whose audio files should be looked up
+    
+    Returns the preload thread.
+    """
+    def preload():
+        for directory in directories:
+            try:
+                with os.scandir(directory) as entries:
+                    paths = [e.path for e in entries
+                             if e.is_file() and os.path.splitext(e.name)[1].lower() in AUDIO_EXTENSIONS]
+            except OSError:
+                continue
+            for path in paths:
+                get_audio_duration(path)
+    
+    thread = threading.Thread(target=preload, name="duration-preload", daemon=True)
+    thread.start()
+    return thread
+
+@functools.lru_cache(maxsize=None)
+def _which(command):
+    """Cached shutil.which lookup."""
+    return shutil.which(command)
+
+def _spawn(cmd):
+    """
+    Start a player process as cheaply as possible.
+    
+    With an absolute executable path and close_fds=False, subprocess uses
+    posix_spawn instead of fork, so the Python process' page tables aren't copied.
+    """
+    executable = _which(cmd[0]) or cmd[0]
+    return subprocess.Popen([executable] + cmd[1:], close_fds=False)
+
+_AudioEnv = namedtuple("_AudioEnv", ["players", "soundcards_found", "soundcard_error"])
+
+@functools.lru_cache(maxsize=None)
+def _detect_audio_env():
+    """
+    Look up the system audio players and ALSA sound cards.
+
+    This only runs once per process; later audio system checks reuse the result.
+    """
+    players = []
+    for command, label in (("aplay", "aplay (WAV)"),
+                           ("mpg123", "mpg123 (MP3)"),
+                           ("ogg123", "ogg123 (OGG)")):
+        if _which(command):
+            players.append(label)
+    
+    soundcards_found = None
+    soundcard_error = None
+    try:
+        # Same information as 'aplay -l', without starting a process
+        with open("/proc/asound/cards") as f:
+            cards = f.read().lower()
+        soundcards_found = bool(cards.strip()) and "no soundcards" not in cards
+    except Exception as e:
+        soundcard_error = e
+    
+    return _AudioEnv(tuple(players), soundcards_found, soundcard_error)
+
 class AudioOutput:
-    def __init__(self, audio_dir="/home/pi/audio_files"):
+    def __init__(self, audio_dir="/home/pi/audio_files", preload=None, check=False):
         """
         Initialize the audio output.
         
         Args:
             audio_dir: Directory where audio files are stored
+            preload: Names of files in audio_dir to decode into memory for instant playback
+                     (default: every audio file in audio_dir)
+            check: Run check_audio_system() diagnostics during construction (default: False)
         """
         self.audio_dir = audio_dir
         self.current_process = None
         
+        # Make sure ALSA uses the headphone jack (card 1) for this process
+        os.environ['ALSA_CARD'] = '1'
+        # Set once the amixer routing has been applied
+        self._routed = False
+        
+        # Long-lived aplay process fed raw PCM on stdin, and when its current clip ends
+        self._aplay = None
+        self._aplay_busy_until = 0
+        
+        # Scratch buffer reused for every tone; pygame copies it when building a Sound
+        self._tone_buf = np.empty(int(SAMPLE_RATE * TONE_BUFFER_SECONDS), dtype=np.int16)
+        self._tone_lock = threading.Lock()
+        # Recently played tone Sounds keyed by (frequency, duration, volume), least recent first
+        self._tone_cache = OrderedDict()
+        
+        # Directory listings keyed by path, invalidated when the directory mtime changes
+        self._audio_file_cache = {}
+        
         # Create audio directory if it doesn't exist
         os.makedirs(self.audio_dir, exist_ok=True)
         
         # Initialize pygame mixer if available
         if PYGAME_AVAILABLE:
             try:
-                pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=2048)
+                pygame.mixer.init(frequency=SAMPLE_RATE, size=-16, channels=MIXER_CHANNELS, buffer=MIXER_BUFFER)
                 print("Pygame mixer initialized for audio playback")
             except Exception as e:
                 print(f"Error reinitializing pygame mixer: {e}")
         else:
             print("Pygame mixer not available. Using system commands for audio playback.")
             
-        # Check audio system
-        self.check_audio_system()
+        # Check audio system only when diagnostics were asked for
+        if check:
+            self.check_audio_system()
+        
+        # Sound for the pre-rendered alarm cycle so play_alarm can just loop it
+        self._alarm_sound = None
+        # Channel 0 is reserved for tones so they never compete with other sounds
+        self._tone_channel = None
+        if PYGAME_AVAILABLE:
+            try:
+                pygame.mixer.set_reserved(1)
+                self._tone_channel = pygame.mixer.Channel(0)
+                self._alarm_sound = _make_sound(_ALARM_SAMPLES)
+            except Exception as e:
+                print(f"Error preparing alarm tones: {e}")
+        
+        # Decoded Sounds keyed by absolute path, played straight from memory.
+        # MP3/OGG are decoded to PCM once here rather than on every trigger
+        self._sound_cache = {}
+        if PYGAME_AVAILABLE:
+            available = self.list_audio_files()
+            if preload is None:
+                preload = available
+            for name in preload:
+                if name not in available:
+                    continue
+                path = os.path.abspath(os.path.join(self.audio_dir, name))
+                try:
+                    self._sound_cache[path] = pygame.mixer.Sound(path)
+                except Exception as e:
+                    print(f"Could not preload {name}: {e}")
+    
+    @contextlib.contextmanager
+    def _open_pcm(self, rate, channels):
+        """
+        Open an ALSA playback handle on PCM_DEVICE for one clip.
+        
+        Yields the handle, or None if the device could not be opened. The hw
+        device only takes one opener (pygame and the aplay/mpg123 players need
+        it too), so the handle is drained and released as soon as the clip ends.
+        """
+        # An idle aplay stream would keep the device busy
+        if self._aplay is not None and time.monotonic() >= self._aplay_busy_until:
+            self._close_aplay_stream()
+        
+        try:
+            pcm = alsaaudio.PCM(
+                alsaaudio.PCM_PLAYBACK,
+                device=PCM_DEVICE,
+                rate=rate,
+                channels=channels,
+                format=alsaaudio.PCM_FORMAT_S16_LE,
+                periodsize=PCM_PERIOD_SIZE,
+            )
+        except Exception as e:
+            print(f"Could not open ALSA PCM {PCM_DEVICE}: {e}")
+            yield None
+            return
+        
+        try:
+            yield pcm
+            # Wait for the periods still queued in ALSA before reporting the clip done
+            if hasattr(pcm, 'drain'):
+                pcm.drain()
+        finally:
+            pcm.close()
+    
+    def _close_aplay_stream(self):
+        """Kill the long-lived aplay process, dropping anything it still has queued."""
+        try:
+            self._aplay.kill()
+            self._aplay.wait(timeout=1)
+        except Exception as e:
+            print(f"Error stopping aplay stream: {e}")
+        finally:
+            self._aplay = None
+            self._aplay_busy_until = 0
+    
+    def _play_wav_pcm(self, filename):
+        """
+        Stream a 16-bit WAV file straight to ALSA, blocking until it has played.
+        
+        Returns True if the file was played, False if it needs another method.
+        """
+        with wave.open(filename, 'rb') as w:
+            if w.getsampwidth() != 2:
+                return False
+            with self._open_pcm(w.getframerate(), w.getnchannels()) as pcm:
+                if pcm is None:
+                    return False
+                while data := w.readframes(PCM_PERIOD_SIZE):
+                    pcm.write(data)
+        return True
     
-    def play_tone(self, frequency, duration=0.5, volume=50):
+    def _play_wav_stream(self, filename, blocking):
+        """
+        Write a WAV file's PCM frames to a long-lived raw-mode aplay process.
+        
+        Returns True if the file was queued, False if its format doesn't match
+        the stream and it needs another method.
+        """
+        params, frames = _load_wav(filename, os.stat(filename).st_mtime_ns)
+        if params != STREAM_FORMAT:
+            return False
+        
+        if self._aplay is None or self._aplay.poll() is not None:
+            rate, channels, _ = STREAM_FORMAT
+            self._aplay = subprocess.Popen(
+                ["aplay", "-q", "-D", PCM_DEVICE, "-t", "raw", "-f", "S16_LE",
+                 "-r", str(rate), "-c", str(channels), "-"],
+                stdin=subprocess.PIPE, bufsize=0)
+        
+        proc = self._aplay
+        self._aplay_busy_until = time.monotonic() + len(frames) / (SAMPLE_RATE * 2)
+        if blocking:
+            proc.stdin.write(frames)
+            time.sleep(max(0, self._aplay_busy_until - time.monotonic()))
+        else:
+            # The pipe only buffers 64 KB: write the first chunk here so a dead
+            # aplay shows up as a broken pipe now, and the rest from a background thread
+            view = memoryview(frames)
+            proc.stdin.write(view[:APLAY_PIPE_CHUNK])
+            if len(view) > APLAY_PIPE_CHUNK:
+                threading.Thread(target=self._feed_aplay, args=(proc, view[APLAY_PIPE_CHUNK:]), daemon=True).start()
+        
+        # Raw-mode aplay only exits at end of input, so an exit here means it
+        # failed (e.g. the device was busy) and nothing was played
+        if proc.poll() is not None:
+            print(f"Persistent aplay stream exited with code {proc.returncode}")
+            self._aplay = None
+            self._aplay_busy_until = 0
+            return False
+        return True
+    
+    def _feed_aplay(self, proc, frames):
+        """Write frames to aplay from a background thread, dropping the stream if aplay died."""
+        try:
+            proc.stdin.write(frames)
+        except (BrokenPipeError, ValueError) as e:
+            # stop_audio() kills the stream on purpose and clears self._aplay first
+            if self._aplay is proc:
+                print(f"Persistent aplay stream broke: {e}")
+                self._aplay = None
+                self._aplay_busy_until = 0
+    
+    def _write_pcm_samples(self, pcm, audio_data):
+        """
+        Write 16-bit samples to an ALSA handle in whole periods.
+        
+        The numpy buffer is passed by reference through a memoryview
+        rather than being copied into a bytes object first.
+        """
+        remainder = len(audio_data) % PCM_PERIOD_SIZE
+        if remainder:
+            padding = np.zeros(PCM_PERIOD_SIZE - remainder, dtype=np.int16)
+            audio_data = np.concatenate((audio_data, padding))
+        view = memoryview(np.ascontiguousarray(audio_data)).cast('B')
+        step = PCM_PERIOD_SIZE * audio_data.itemsize
+        for start in range(0, len(view), step):
+            pcm.write(view[start:start + step])
+    
+    def _play_on_tone_channel(self, sound):
+        """Play a tone Sound on the reserved tone channel, if there is one, and return the channel."""
+        if self._tone_channel is not None:
+            self._tone_channel.play(sound)
+            return self._tone_channel
+        return sound.play()
+    
+    def _make_tone_sound(self, frequency, duration, volume, waveform='sine'):
+        """Create a pygame Sound containing a tone."""
+        num_samples = int(SAMPLE_RATE * duration)
+        if num_samples > len(self._tone_buf):
+            if waveform == 'sine':
+                return _make_sound(_tone_samples(frequency, duration, volume))
+            return _make_sound(_generate(waveform, frequency, duration, volume))
+        with self._tone_lock:
+            out = self._tone_buf[:num_samples]
+            if waveform == 'sine':
+                # Sines have the faster cached-period / Numba path
+                _fill_tone(out, frequency, volume)
+            else:
+                _generate(waveform, frequency, duration, volume, out=out)
+            return _make_sound(out)
+    
+    def _cached_tone_sound(self, frequency, duration, volume, waveform='sine'):
+        """Return a tone Sound from the LRU cache, building and storing it on a miss."""
+        key = (frequency, round(duration, 4), volume, waveform)
+        sound = self._tone_cache.get(key)
+        if sound is not None:
+            self._tone_cache.move_to_end(key)
+            return sound
+        
+        sound = self._make_tone_sound(frequency, duration, volume, waveform)
+        self._tone_cache[key] = sound
+        if len(self._tone_cache) > TONE_CACHE_SIZE:
+            self._tone_cache.popitem(last=False)
+        return sound
+    
+    def play_tone(self, frequency, duration=0.5, volume=50, blocking=True, waveform='sine'):
         """
         Play a tone of specified frequency.
         
@@ -110,32 +690,44 @@ class AudioOutput:
             frequency: Frequency in Hz
             duration: Duration in seconds
             volume: Volume level (0-100)
+            blocking: Whether to wait for the tone to finish (default: True)
+            waveform: 'sine', 'square' or 'triangle' (default: 'sine')
+        
+        Returns:
+            The pygame Channel playing the tone (poll get_busy() when not blocking),
+            or None when the tone was played without pygame.
         """
         if frequency <= 0:
-            return
+            return None
         
         if PYGAME_AVAILABLE:
-            # Generate a sine wave
-            sample_rate = 44100
-            t = np.linspace(0, duration, int(sample_rate * duration), False)
-            tone = np.sin(frequency * 2 * np.pi * t) * (volume / 100)
-            
-            # Convert to 16-bit signed integers
-            audio_data = (tone * 32767).astype(np.int16)
-            
-            # Create a pygame Sound object
-            sound = pygame.mixer.Sound(audio_data.tobytes())
+            # Get a pygame Sound object for the sine wave (reused for repeated tones)
+            sound = self._cached_tone_sound(frequency, duration, volume, waveform)
             
             # Play the sound
-            sound.play()
+            channel = self._play_on_tone_channel(sound)
             
             # Wait for the sound to finish
-            time.sleep(duration)
+            if blocking:
+                time.sleep(duration)
+            return channel
+        elif ALSAAUDIO_AVAILABLE:
+            # Write the tone straight to the ALSA device
+            if waveform == 'sine':
+                samples = _tone_samples(frequency, duration, volume)
+            else:
+                samples = _generate(waveform, frequency, duration, volume)
+            try:
+                with self._open_pcm(SAMPLE_RATE, 1) as pcm:
+                    if pcm is not None:
+                        self._write_pcm_samples(pcm, samples)
+            except Exception as e:
+                print(f"Error playing tone: {e}")
         else:
-            # Fallback to using system command (aplay)
-            cmd = f"play -n synth {duration} sine {frequency} vol {volume/100}"
+            # Fallback to using system command (SoX play), run directly without a shell
+            cmd = ["play", "-n", "synth", str(duration), waveform, str(frequency), "vol", str(volume / 100)]
             try:
-                subprocess.run(cmd, shell=True, check=False)
+                subprocess.run(cmd, check=False)
             except Exception as e:
                 print(f"Error playing tone: {e}")
     
@@ -152,10 +744,18 @@ class AudioOutput:
             self.play_audio_file(alarm_file)
             return
             
-        # Otherwise generate an alarm tone
+        # Otherwise loop the pre-rendered two-tone pattern in the mixer
+        if self._alarm_sound is not None:
+            # Ask for just enough repeats that the mixer stops on its own
+            loops = max(0, math.ceil(duration / ALARM_CYCLE_SECONDS) - 1)
+            self._tone_channel.play(self._alarm_sound, loops=loops)
+            time.sleep(duration)
+            self._tone_channel.stop()
+            return
+        
+        # Without pygame, alternate between two frequencies for alarm effect
         start_time = time.time()
         while time.time() - start_time < duration:
-            # Alternate between two frequencies for alarm effect
             self.play_tone(800, 0.1, 70)
             self.play_tone(600, 0.1, 70)
     
@@ -171,9 +771,17 @@ class AudioOutput:
             print("Error: notes and durations must have the same length")
             return
             
-        for i in range(len(notes)):
-            self.play_tone(notes[i], durations[i])
-            time.sleep(0.05)  # Small pause between notes
+        if not PYGAME_AVAILABLE:
+            for i in range(len(notes)):
+                self.play_tone(notes[i], durations[i])
+                time.sleep(0.05)  # Small pause between notes
+            return
+        
+        # Render the whole melody (with a small pause after each note) into one buffer
+        # so it plays as a single Sound
+        audio_data = _melody_samples(notes, durations)
+        self._play_on_tone_channel(_make_sound(audio_data))
+        time.sleep(len(audio_data) / SAMPLE_RATE)
     
     def list_audio_files(self, directory=None):
         """
@@ -192,11 +800,16 @@ class AudioOutput:
                 os.makedirs(directory, exist_ok=True)
                 return []
                 
-            # List all files
-            files = os.listdir(directory)
-            
-            # Filter for audio files
-            audio_files = [f for f in files if f.lower().endswith(('.wav', '.mp3', '.ogg'))]
+            # Reuse the previous scan if the directory hasn't changed since
+            mtime = os.stat(directory).st_mtime_ns
+            cached = self._audio_file_cache.get(directory)
+            if cached is not None and cached[0] == mtime:
+                audio_files = list(cached[1])
+            else:
+                with os.scandir(directory) as entries:
+                    audio_files = [e.name for e in entries
+                                   if e.is_file() and os.path.splitext(e.name)[1].lower() in AUDIO_EXTENSIONS]
+                self._audio_file_cache[directory] = (mtime, tuple(audio_files))
             
             if audio_files:
                 print(f"Found {len(audio_files)} audio file(s) in {directory}")
@@ -229,128 +842,75 @@ class AudioOutput:
         # Ensure audio is routed to headphone jack
         self._ensure_headphone_output()
         
-        # For WAV files, use a simpler approach to avoid memory issues
-        if filename.lower().endswith('.wav'):
-            try:
-                # Try multiple methods to play WAV files
-                print("Playing WAV file through headphone jack...")
-                
-                # Method 1: aplay with headphone device specification (card 1)
-                try:
-                    # Use card 1 (Headphones) based on audio test results
-                    if blocking:
-                        # Blocking mode - wait for playback to complete
-                        subprocess.run(["aplay", "-D", "plughw:1,0", "-q", filename], check=False)
-                        print("WAV playback complete using plughw:1,0 (headphone jack)")
-                    else:
-                        # Non-blocking mode - start playback and return immediately
-                        self.current_process = subprocess.Popen(["aplay", "-D", "plughw:1,0", "-q", filename])
-                        print("WAV playback started in non-blocking mode using plughw:1,0 (headphone jack)")
-                    return True
-                except Exception as e:
-                    print(f"Method 1 failed: {e}, trying next method...")
-                
-                # Method 2: standard aplay
-                try:
-                    if blocking:
-                        # Blocking mode - wait for playback to complete
-                        subprocess.run(["aplay", "-q", filename], check=False)
-                        print("WAV playback complete using standard aplay")
-                    else:
-                        # Non-blocking mode - start playback and return immediately
-                        self.current_process = subprocess.Popen(["aplay", "-q", filename])
-                        print("WAV playback started in non-blocking mode using standard aplay")
-                    return True
-                except Exception as e:
-                    print(f"Method 2 failed: {e}, trying next method...")
-                    
-                # Method 3: Try pygame
-                if PYGAME_AVAILABLE:
-                    try:
-                        # Set volume
-                        pygame.mixer.music.set_volume(volume)
-                        
-                        pygame.mixer.music.load(filename)
-                        pygame.mixer.music.play()
-                        
-                        if blocking:
-                            # Wait for playback to complete
-                            while pygame.mixer.music.get_busy():
-                                time.sleep(0.1)
-                            print("WAV playback complete using pygame")
-                        else:
-                            print("WAV playback started in non-blocking mode using pygame")
-                        return True
-                    except Exception as e:
-                        print(f"Method 3 failed: {e}")
-                        
-                print("All WAV playback methods failed")
-                return False
-            except Exception as e:
-                print(f"Error playing WAV file: {e}")
-                return False
+        # Preloaded files play straight from memory
+        sound = self._sound_cache.get(os.path.abspath(filename))
+        if sound is not None:
+            sound.set_volume(volume)
+            sound.play()
+            if blocking:
+                time.sleep(sound.get_length())
+            print("Audio playback started from preloaded sound")
+            return True
         
-        # For MP3 files
-        elif filename.lower().endswith('.mp3'):
-            # Try multiple methods for MP3
+        # Pick the playback method from the file extension
+        ext = os.path.splitext(filename)[1].lower()
+        handler = self._HANDLERS.get(ext, AudioOutput._play_other)
+        return handler(self, filename, volume, blocking)
+    
+    def _play_wav(self, filename, volume, blocking):
+        """Play a WAV file, using a simpler approach to avoid memory issues."""
+        try:
+            # Try multiple methods to play WAV files
+            print("Playing WAV file through headphone jack...")
             
-            # Method 1: Try pygame first
-            if PYGAME_AVAILABLE:
+            # Method 0: write straight to the ALSA device, held only for this clip
+            if blocking and ALSAAUDIO_AVAILABLE:
                 try:
-                    # Set volume according to parameter
-                    pygame.mixer.music.set_volume(volume)
-                    
-                    # Load and play the file
-                    pygame.mixer.music.load(filename)
-                    pygame.mixer.music.play()
-                    
-                    # Give a moment for playback to start
-                    time.sleep(0.1)
-                    
-                    if pygame.mixer.music.get_busy():
-                        print("MP3 playback started with pygame")
+                    if self._play_wav_pcm(filename):
+                        print(f"WAV playback complete using ALSA PCM {PCM_DEVICE} (headphone jack)")
                         return True
                 except Exception as e:
-                    print(f"Pygame MP3 playback failed: {e}, trying next method...")
+                    print(f"Method 0 failed: {e}, trying next method...")
             
-            # Method 2: Try mpg123 with specific output device (headphone jack)
+            # Stream into the long-lived aplay process, skipping a process start per clip
             try:
-                # Try to use the headphone jack directly (card 1)
-                # Convert volume (0.0-1.0) to mpg123 scale (0-100)
-                vol_percent = int(volume * 100)
-                cmd = ["mpg123", "-a", "hw:1,0", "-q", "--scale", str(vol_percent), filename]
-                print(f"Playing with command: {' '.join(cmd)}")
-                process = subprocess.Popen(cmd)
-                
-                # Store the process only if it started successfully
-                if process.poll() is None:
-                    self.current_process = process
-                    print("MP3 playback started with mpg123 using hw:1,0 (headphone jack)")
+                if self._play_wav_stream(filename, blocking):
+                    print("WAV playback using persistent aplay stream (headphone jack)")
                     return True
             except Exception as e:
-                print(f"mpg123 with device specification failed: {e}, trying next method...")
+                self._aplay = None
+                print(f"Persistent aplay stream failed: {e}, trying next method...")
             
-            # Method 3: Standard mpg123
+            # Method 1: aplay with headphone device specification (card 1)
             try:
-                # Convert volume (0.0-1.0) to mpg123 scale (0-100)
-                vol_percent = int(volume * 100)
-                cmd = ["mpg123", "-q", "--scale", str(vol_percent), filename]
-                print(f"Playing with command: {' '.join(cmd)}")
-                process = subprocess.Popen(cmd)
-                
-                if process.poll() is None:
-                    self.current_process = process
-                    print("MP3 playback started with standard mpg123")
-                    return True
+                # Use card 1 (Headphones) based on audio test results
+                if blocking:
+                    # Blocking mode - wait for playback to complete
+                    subprocess.run(["aplay", "-D", "plughw:1,0", "-q", filename], check=False)
+                    print("WAV playback complete using plughw:1,0 (headphone jack)")
+                else:
+                    # Non-blocking mode - start playback and return immediately
+                    self.current_process = subprocess.Popen(["aplay", "-D", "plughw:1,0", "-q", filename])
+                    print("WAV playback started in non-blocking mode using plughw:1,0 (headphone jack)")
+                return True
+            except Exception as e:
+                print(f"Method 1 failed: {e}, trying next method...")
+            
+            # Method 2: standard aplay
+            try:
+                if blocking:
+                    # Blocking mode - wait for playback to complete
+                    subprocess.run(["aplay", "-q", filename], check=False)
+                    print("WAV playback complete using standard aplay")
+                else:
+                    # Non-blocking mode - start playback and return immediately
+                    self.current_process = subprocess.Popen(["aplay", "-q", filename])
+                    print("WAV playback started in non-blocking mode using standard aplay")
+                return True
             except Exception as e:
-                print(f"Standard mpg123 failed: {e}")
+                print(f"Method 2 failed: {e}, trying next method...")
                 
-            print("All MP3 playback methods failed")
-            return False
-        
-        # For other formats
-        else:
-            # Try pygame first
+            # Method 3: Try pygame
             if PYGAME_AVAILABLE:
                 try:
                     # Set volume
@@ -358,54 +918,165 @@ class AudioOutput:
                     
                     pygame.mixer.music.load(filename)
                     pygame.mixer.music.play()
-                    time.sleep(0.1)
-                    if pygame.mixer.music.get_busy():
-                        print("Audio playback started with pygame")
-                        return True
+                    
+                    if blocking:
+                        # Wait for playback to complete
+                        self._wait_for_music_end()
+                        print("WAV playback complete using pygame")
+                    else:
+                        print("WAV playback started in non-blocking mode using pygame")
+                    return True
                 except Exception as e:
-                    print(f"Pygame playback failed: {e}, trying system commands...")
+                    print(f"Method 3 failed: {e}")
+                    
+            print("All WAV playback methods failed")
+            return False
+        except Exception as e:
+            print(f"Error playing WAV file: {e}")
+            return False
+    
+    def _play_mp3(self, filename, volume, blocking):
+        """Play an MP3 file."""
+        # Try multiple methods for MP3
+        
+        # Method 1: Try pygame first
+        if PYGAME_AVAILABLE:
+            try:
+                # Set volume according to parameter
+                pygame.mixer.music.set_volume(volume)
+                
+                # Load and play the file
+                pygame.mixer.music.load(filename)
+                pygame.mixer.music.play()
+                
+                # Give a moment for playback to start
+                time.sleep(0.1)
+                
+                if pygame.mixer.music.get_busy():
+                    print("MP3 playback started with pygame")
+                    return True
+            except Exception as e:
+                print(f"Pygame MP3 playback failed: {e}, trying next method...")
+        
+        # Method 2: Try mpg123 with specific output device (headphone jack)
+        try:
+            # Try to use the headphone jack directly (card 1)
+            # Convert volume (0.0-1.0) to mpg123 scale (0-100)
+            vol_percent = int(volume * 100)
+            cmd = ["mpg123", "-a", "hw:1,0", "-q", "--scale", str(vol_percent), filename]
+            print(f"Playing with command: {shlex.join(cmd)}")
+            process = _spawn(cmd)
             
-            # Use system command as fallback
+            # Store the process only if it started successfully
+            if process.poll() is None:
+                self.current_process = process
+                print("MP3 playback started with mpg123 using hw:1,0 (headphone jack)")
+                return True
+        except Exception as e:
+            print(f"mpg123 with device specification failed: {e}, trying next method...")
+        
+        # Method 3: Standard mpg123
+        try:
+            # Convert volume (0.0-1.0) to mpg123 scale (0-100)
+            vol_percent = int(volume * 100)
+            cmd = ["mpg123", "-q", "--scale", str(vol_percent), filename]
+            print(f"Playing with command: {shlex.join(cmd)}")
+            process = _spawn(cmd)
+            
+            if process.poll() is None:
+                self.current_process = process
+                print("MP3 playback started with standard mpg123")
+                return True
+        except Exception as e:
+            print(f"Standard mpg123 failed: {e}")
+            
+        print("All MP3 playback methods failed")
+        return False
+    
+    def _play_other(self, filename, volume, blocking):
+        """Play an OGG or other audio file."""
+        # Try pygame first
+        if PYGAME_AVAILABLE:
             try:
-                # Choose the appropriate command based on file type
-                if filename.lower().endswith('.ogg'):
-                    # Convert volume (0.0-1.0) to ogg123 scale (0.0-1.0)
-                    cmd = ["ogg123", "-d", "alsa", "-q", "--volume", str(volume), filename]  # Specify ALSA output
-                else:
-                    # aplay doesn't have direct volume control, we'll use softvol plugin if needed
-                    vol_percent = int(volume * 100)
-                    if volume < 1.0:
-                        cmd = ["aplay", "-D", f"softvol:softvol=volume={vol_percent}", "-q", filename]
-                    else:
-                        cmd = ["aplay", "-D", "plughw:0,0", "-q", filename]  # Try with device specification
-                    
-                print(f"Playing with command: {' '.join(cmd)}")
-                process = subprocess.Popen(cmd)
+                # Set volume
+                pygame.mixer.music.set_volume(volume)
                 
-                if process.poll() is None:
-                    self.current_process = process
-                    print("Audio playback started with system command")
+                pygame.mixer.music.load(filename)
+                pygame.mixer.music.play()
+                time.sleep(0.1)
+                if pygame.mixer.music.get_busy():
+                    print("Audio playback started with pygame")
                     return True
-                else:
-                    print("Failed to start audio playback process")
-                    return False
-                    
             except Exception as e:
-                print(f"Error playing audio file with system command: {e}")
+                print(f"Pygame playback failed: {e}, trying system commands...")
+        
+        # Use system command as fallback
+        try:
+            # Choose the appropriate command based on file type
+            if os.path.splitext(filename)[1].lower() == '.ogg':
+                # Convert volume (0.0-1.0) to ogg123 scale (0.0-1.0)
+                cmd = ["ogg123", "-d", "alsa", "-q", "--volume", str(volume), filename]  # Specify ALSA output
+            else:
+                # aplay doesn't have direct volume control, we'll use softvol plugin if needed
+                vol_percent = int(volume * 100)
+                if volume < 1.0:
+                    cmd = ["aplay", "-D", f"softvol:softvol=volume={vol_percent}", "-q", filename]
+                else:
+                    cmd = ["aplay", "-D", "plughw:0,0", "-q", filename]  # Try with device specification
+                
+            print(f"Playing with command: {shlex.join(cmd)}")
+            process = subprocess.Popen(cmd)
+            
+            if process.poll() is None:
+                self.current_process = process
+                print("Audio playback started with system command")
+                return True
+            else:
+                print("Failed to start audio playback process")
                 return False
                 
+        except Exception as e:
+            print(f"Error playing audio file with system command: {e}")
+            return False
+    
+    # Extension -> playback method; anything else goes through _play_other
+    _HANDLERS = {
+        '.wav': _play_wav,
+        '.mp3': _play_mp3,
+        '.ogg': _play_other,
+    }
+    
+    def _wait_for_music_end(self):
+        """
+        Block until pygame.mixer.music playback finishes.
+        
+        Sleeps on pygame's end-of-track event rather than polling get_busy().
+        The event queue needs pygame's video subsystem, so without it we
+        fall back to polling.
+        """
+        try:
+            pygame.mixer.music.set_endevent(MUSIC_END_EVENT)
+            # The timeout covers the track ending before the end event was registered
+            while pygame.mixer.music.get_busy():
+                if pygame.event.wait(1000).type == MUSIC_END_EVENT:
+                    break
+        except pygame.error:
+            while pygame.mixer.music.get_busy():
+                time.sleep(0.1)
+        finally:
+            pygame.mixer.music.set_endevent()
+    
     def _ensure_headphone_output(self):
-        """Ensure audio is routed to the headphone jack"""
+        """Ensure audio is routed to the headphone jack (only done once per instance)"""
+        if self._routed:
+            return
+        self._routed = True
         try:
             # Try to force audio to the headphone jack (card 1)
             subprocess.run(["amixer", "cset", "numid=3", "1"], check=False)
             
             # Set volume to maximum
             subprocess.run(["amixer", "set", "Master", "100%"], check=False)
-            
-            # Create a temporary ALSA config for this process if needed
-            # This ensures we're using the headphone jack (card 1)
-            os.environ['ALSA_CARD'] = '1'
         except Exception as e:
             print(f"Warning: Could not ensure headphone output: {e}")
             # Continue anyway, as we have multiple fallback methods
@@ -440,6 +1111,11 @@ class AudioOutput:
                 # Clear the reference to avoid double free
                 self.current_process = None
         
+        # The persistent aplay can't drop audio it has already been sent, so
+        # restart it if a clip is still playing; otherwise leave it running
+        if self._aplay is not None and time.monotonic() < self._aplay_busy_until:
+            self._close_aplay_stream()
+        
         # We'll avoid the aggressive pkill approach as it might be causing the double free
         # Instead, we'll just make sure our own process is properly terminated
     
@@ -480,41 +1156,22 @@ class AudioOutput:
             print(f"✗ No audio files found in {self.audio_dir}")
             print(f"  You can add .wav, .mp3, or .ogg files to this directory")
         
+        env = _detect_audio_env()
+        
         # Check for system audio players
-        audio_players = []
-        try:
-            # Check for aplay (for WAV files)
-            result = subprocess.run(["which", "aplay"], capture_output=True, text=True)
-            if result.returncode == 0:
-                audio_players.append("aplay (WAV)")
-                
-            # Check for mpg123 (for MP3 files)
-            result = subprocess.run(["which", "mpg123"], capture_output=True, text=True)
-            if result.returncode == 0:
-                audio_players.append("mpg123 (MP3)")
-                
-            # Check for ogg123 (for OGG files)
-            result = subprocess.run(["which", "ogg123"], capture_output=True, text=True)
-            if result.returncode == 0:
-                audio_players.append("ogg123 (OGG)")
-                
-            if audio_players:
-                print(f"✓ Found audio players: {', '.join(audio_players)}")
-            else:
-                print("✗ No system audio players found")
-                print("  Consider installing: sudo apt install alsa-utils mpg123 vorbis-tools")
-        except Exception as e:
-            print(f"Error checking audio players: {e}")
+        if env.players:
+            print(f"✓ Found audio players: {', '.join(env.players)}")
+        else:
+            print("✗ No system audio players found")
+            print("  Consider installing: sudo apt install alsa-utils mpg123 vorbis-tools")
             
-        # Try to get audio devices
-        try:
-            result = subprocess.run(["aplay", "-l"], capture_output=True, text=True)
-            if "no soundcards found" in result.stdout.lower() or "no soundcards found" in result.stderr.lower():
-                print("✗ No sound cards detected by ALSA")
-            else:
-                print("✓ Sound card(s) detected by ALSA")
-        except Exception as e:
-            print(f"Error checking sound cards: {e}")
+        # Check audio devices
+        if env.soundcard_error is not None:
+            print(f"Error checking sound cards: {env.soundcard_error}")
+        elif env.soundcards_found:
+            print("✓ Sound card(s) detected by ALSA")
+        else:
+            print("✗ No sound cards detected by ALSA")
             
         print("Audio system check complete\n")
 
@@ -522,7 +1179,7 @@ class AudioOutput:
 # Example usage
 if __name__ == "__main__":
     try:
-        audio = AudioOutput()
+        audio = AudioOutput(check=True)
         
         # Play a simple tone
         print("Playing a tone...")
@@ -5,6 +5,7 @@ This script tests different audio output methods to help configure the headphone
 """
 import os
 import sys
+import shlex
 import subprocess
 import time
 import argparse
@@ -26,10 +27,16 @@ def check_audio_devices():
     """Check available audio devices"""
     print("\n=== CHECKING AUDIO DEVICES ===")
     
-    # Check ALSA devices
+    # Check ALSA devices (read straight from procfs instead of running aplay -l)
     print("\nALSA Devices:")
     try:
-        subprocess.run(["aplay", "-l"], check=False)
+        with open("/proc/asound/pcm") as f:
+            devices = [line.strip() for line in f if line.strip()]
+        if devices:
+            for device in devices:
+                print(f"  {device}")
+        else:
+            print("  No ALSA PCM devices found")
     except Exception as e:
         print(f"Error checking ALSA devices: {e}")
     
@@ -43,9 +50,9 @@ def check_audio_devices():
     # Check if headphone jack is detected
     print("\nChecking for headphone jack:")
     try:
-        result = subprocess.run(["grep", "headphone", "/proc/asound/cards"], 
-                               capture_output=True, text=True, check=False)
-        if "headphone" in result.stdout.lower():
+        with open("/proc/asound/cards") as f:
+            cards = f.read()
+        if "headphone" in cards.lower():
             print("Headphone jack detected!")
         else:
             print("Headphone jack not explicitly detected in sound cards.")
@@ -82,8 +89,10 @@ def test_pygame_audio():
     print("\n=== TESTING PYGAME AUDIO ===")
     
     try:
-        # Initialize pygame mixer
-        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=2048)
+        # Initialize pygame mixer with a small buffer for low latency; pre_init makes
+        # sure pygame.init() below uses the same settings
+        pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=512)
+        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
         print("Pygame mixer initialized")
         
         # Generate a test tone
@@ -139,7 +148,7 @@ def test_aplay():
     success = False
     for i, cmd in enumerate(methods):
         try:
-            print(f"\nMethod {i+1}: {' '.join(cmd)}")
+            print(f"\nMethod {i+1}: {shlex.join(cmd)}")
             subprocess.run(cmd, check=False)
             print(f"Method {i+1} completed")
             success = True
@@ -226,7 +235,7 @@ def test_mpg123():
     success = False
     for i, cmd in enumerate(methods):
         try:
-            print(f"\nMethod {i+1}: {' '.join(cmd)}")
+            print(f"\nMethod {i+1}: {shlex.join(cmd)}")
             subprocess.run(cmd, check=False)
             print(f"Method {i+1} completed")
             success = True
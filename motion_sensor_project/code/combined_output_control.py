@@ -7,13 +7,46 @@ import os
 import time
 import logging
 import sys  # Add sys import for error handling
-from output_control import OutputDevice  # Fix: Use OutputDevice instead of OutputControl
+import asyncio
+import concurrent.futures
+import functools
+import atexit
+from output_control import OutputDevice, GpiodOutputDevice, GPIOD_AVAILABLE
 from usb_relay_control import USBRelay
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Environment variable that forces the output type ("gpio" or "usb_relay")
+# and skips hardware detection, e.g. for testing
+OUTPUT_TYPE_ENV = "DILLY_OUTPUT"
+
+@functools.lru_cache(maxsize=1)
+def detect_output_type():
+    """
+    Detect which output type to use, once per process.
+    
+    The DILLY_OUTPUT environment variable wins if set. Otherwise a USB relay
+    is probed first (opening the serial port is slow), falling back to GPIO.
+    """
+    forced = os.environ.get(OUTPUT_TYPE_ENV, "").strip().lower()
+    if forced in (CombinedOutputControl.GPIO, CombinedOutputControl.USB_RELAY):
+        logger.info(f"Output type set by {OUTPUT_TYPE_ENV}: {forced}")
+        return forced
+    
+    # Try to detect USB relay first
+    temp_usb = USBRelay()
+    if temp_usb.is_connected():
+        temp_usb.cleanup()
+        output_type = CombinedOutputControl.USB_RELAY
+    else:
+        # Fall back to GPIO
+        output_type = CombinedOutputControl.GPIO
+    
+    logger.info(f"Detected output type: {output_type}")
+    return output_type
+
 class CombinedOutputControl:
     """
     Combined output controller that can use either GPIO or USB relay.
@@ -30,7 +63,7 @@ class CombinedOutputControl:
         
         Args:
             output_type: Type of output to use ("gpio" or "usb_relay"). 
-                        If None, will auto-detect.
+                        If None, uses detect_output_type().
             pin_number: GPIO pin number if using GPIO output
             active_high: True if GPIO device is active when pin is high
             usb_port: Serial port for USB relay if using USB relay
@@ -38,16 +71,15 @@ class CombinedOutputControl:
         self.output_type = output_type
         self.gpio_controller = None
         self.usb_controller = None
-        self.is_on = False
         
         # Auto-detect output type if not specified
         if self.output_type is None:
-            self.output_type = self._auto_detect_output_type()
+            self.output_type = detect_output_type()
         
         # Initialize the appropriate controller
         if self.output_type == self.GPIO:
             try:
-                self.gpio_controller = OutputDevice(pin_number, active_high)
+                self.gpio_controller = self._create_gpio_controller(pin_number, active_high)
                 logger.info(f"Using GPIO output on pin {pin_number}")
             except Exception as e:
                 logger.error(f"Failed to initialize GPIO output: {e}")
@@ -63,94 +95,146 @@ class CombinedOutputControl:
                 # Fall back to GPIO if USB fails and GPIO wasn't already tried
                 if self.gpio_controller is None:
                     try:
-                        self.gpio_controller = OutputControl(pin_number, active_high)
+                        self.gpio_controller = self._create_gpio_controller(pin_number, active_high)
                         self.output_type = self.GPIO
                         logger.info(f"Falling back to GPIO output on pin {pin_number}")
                     except Exception as e:
                         logger.error(f"Failed to initialize GPIO fallback: {e}")
-    
-    def _auto_detect_output_type(self):
-        """
-        Auto-detect which output type to use.
-        First tries USB relay, then falls back to GPIO.
-        """
-        # Try to detect USB relay first
-        temp_usb = USBRelay()
-        if temp_usb.is_connected():
-            temp_usb.cleanup()
-            return self.USB_RELAY
         
-        # Fall back to GPIO
-        return self.GPIO
+        # Single worker thread that runs pulse/blink sequences, so their sleeps
+        # don't block the thread that triggered them (keyboard, GPIO, GUI)
+        self._worker = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="output")
+        
+        # Bind the chosen controller's methods onto the instance so each call
+        # forwards straight to it instead of re-checking the output type.
+        # Without a controller the class methods below report the error.
+        active = self._active_controller()
+        if active is not None:
+            # turn_on/turn_off also run on the worker (and wait for it), so they
+            # happen after any queued pulse/blink instead of being undone by it
+            self.turn_on = functools.partial(self._switch, active.turn_on)
+            self.turn_off = functools.partial(self._switch, active.turn_off)
+            self._pulse = active.pulse
+            self._blink = active.blink
+            self._cleanup = active.cleanup
+        else:
+            self._pulse = self._blink = self._no_controller
+            self._cleanup = None
+        
+        # Release the hardware even if the program exits without calling
+        # cleanup() (e.g. an unhandled exception or sys.exit on SIGTERM)
+        self._cleaned_up = False
+        atexit.register(self.cleanup)
+    
+    def _create_gpio_controller(self, pin_number, active_high):
+        """Create the GPIO controller, preferring libgpiod v2 line requests"""
+        if GPIOD_AVAILABLE:
+            try:
+                return GpiodOutputDevice(pin_number, active_high)
+            except Exception as e:
+                logger.warning(f"gpiod output failed, using RPi.GPIO: {e}")
+        return OutputDevice(pin_number, active_high)
+    
+    def _active_controller(self):
+        """Return the controller for the current output type, or None"""
+        if self.output_type == self.GPIO:
+            return self.gpio_controller
+        if self.output_type == self.USB_RELAY:
+            return self.usb_controller
+        return None
+    
+    @property
+    def is_on(self):
+        """True if the output device is currently on"""
+        active = self._active_controller()
+        return active.is_on if active is not None else False
     
     def turn_on(self):
         """Turn on the output device"""
-        if self.output_type == self.GPIO and self.gpio_controller:
-            self.gpio_controller.turn_on()
-            self.is_on = True
-            return True
-        elif self.output_type == self.USB_RELAY and self.usb_controller:
-            success = self.usb_controller.turn_on()
-            self.is_on = success
-            return success
-        else:
-            logger.error("No output controller available")
-            return False
+        logger.error("No output controller available")
+        return False
     
     def turn_off(self):
         """Turn off the output device"""
-        if self.output_type == self.GPIO and self.gpio_controller:
-            self.gpio_controller.turn_off()
-            self.is_on = False
-            return True
-        elif self.output_type == self.USB_RELAY and self.usb_controller:
-            success = self.usb_controller.turn_off()
-            self.is_on = not success  # Only set to False if turn_off was successful
-            return success
-        else:
-            logger.error("No output controller available")
-            return False
+        logger.error("No output controller available")
+        return False
     
     def pulse(self, duration=1.0):
         """
         Turn on the output for a specified duration, then turn it off.
         
+        Runs on the output worker thread and returns immediately; call
+        result() on the returned Future to wait for it. A later turn_on() or
+        turn_off() waits until it has finished.
+        
         Args:
             duration: Time in seconds to keep the output on
+        
+        Returns a Future holding the controller's result.
         """
-        if self.output_type == self.GPIO and self.gpio_controller:
-            self.gpio_controller.pulse(duration)
-            return True
-        elif self.output_type == self.USB_RELAY and self.usb_controller:
-            return self.usb_controller.pulse(duration)
-        else:
-            logger.error("No output controller available")
-            return False
+        return self._worker.submit(self._pulse, duration)
     
     def blink(self, count=3, on_time=0.5, off_time=0.5):
         """
         Blink the output a specified number of times.
         
+        Runs on the output worker thread and returns immediately; call
+        result() on the returned Future to wait for it. A later turn_on() or
+        turn_off() waits until it has finished.
+        
         Args:
             count: Number of blinks
             on_time: Time in seconds to keep the output on during each blink
             off_time: Time in seconds to keep the output off between blinks
+        
+        Returns a Future holding the controller's result.
         """
-        if self.output_type == self.GPIO and self.gpio_controller:
-            self.gpio_controller.blink(count, on_time, off_time)
-            return True
-        elif self.output_type == self.USB_RELAY and self.usb_controller:
-            return self.usb_controller.blink(count, on_time, off_time)
-        else:
-            logger.error("No output controller available")
-            return False
+        return self._worker.submit(self._blink, count, on_time, off_time)
+    
+    async def pulse_async(self, duration=1.0):
+        """Awaitable pulse() for callers running an asyncio event loop"""
+        return await asyncio.wrap_future(self.pulse(duration))
+    
+    async def blink_async(self, count=3, on_time=0.5, off_time=0.5):
+        """Awaitable blink() for callers running an asyncio event loop"""
+        return await asyncio.wrap_future(self.blink(count, on_time, off_time))
+    
+    def _switch(self, method):
+        """
+        Run a controller's turn_on/turn_off on the output worker and return True on success.
+        
+        The GPIO devices return None, the USB relay returns its own success flag.
+        """
+        try:
+            result = self._worker.submit(method).result()
+        except RuntimeError:
+            # The worker has been shut down by cleanup(); nothing can be queued ahead
+            result = method()
+        return True if result is None else result
+    
+    def _no_controller(self, *args):
+        """Stand-in for pulse/blink when no output controller is available"""
+        logger.error("No output controller available")
+        return False
     
     def cleanup(self):
-        """Clean up resources"""
-        if self.output_type == self.GPIO and self.gpio_controller:
-            self.gpio_controller.cleanup()
-        elif self.output_type == self.USB_RELAY and self.usb_controller:
-            self.usb_controller.cleanup()
+        """Clean up resources (safe to call more than once)"""
+        if self._cleaned_up:
+            return
+        self._cleaned_up = True
+        atexit.unregister(self.cleanup)
+        
+        # Let a queued or running pulse/blink finish before releasing the hardware
+        self._worker.shutdown(wait=True)
+        if self._cleanup is not None:
+            self._cleanup()
+    
+    def __enter__(self):
+        """Use the controller in a with-block; cleanup() runs on exit"""
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
 
     def get_output_type(self):
         """Get the current output type being used"""
@@ -163,26 +247,25 @@ def test_combined_output():
     print("Testing Combined Output Controller")
     
     # Test with auto-detection
-    output = CombinedOutputControl()
-    print(f"Using output type: {output.get_output_type()}")
-    
-    print("Turning ON")
-    output.turn_on()
-    time.sleep(2)
-    
-    print("Turning OFF")
-    output.turn_off()
-    time.sleep(1)
-    
-    print("Pulsing")
-    output.pulse(1.0)
-    time.sleep(1)
-    
-    print("Blinking")
-    output.blink(3, 0.3, 0.3)
-    
-    print("Test complete")
-    output.cleanup()
+    with CombinedOutputControl() as output:
+        print(f"Using output type: {output.get_output_type()}")
+        
+        print("Turning ON")
+        output.turn_on()
+        time.sleep(2)
+        
+        print("Turning OFF")
+        output.turn_off()
+        time.sleep(1)
+        
+        print("Pulsing")
+        output.pulse(1.0).result()
+        time.sleep(1)
+        
+        print("Blinking")
+        output.blink(3, 0.3, 0.3).result()
+        
+        print("Test complete")
 
 if __name__ == "__main__":
     test_combined_output()
@@ -4,150 +4,466 @@ Direct Keyboard Input Module for Raspberry Pi
 This module provides keyboard input detection that works with a physical keyboard
 plugged directly into the Raspberry Pi, without requiring SSH or terminal access.
 """
-import threading
 import time
 import os
 import struct
-import select
 import sys
+import fcntl
+import ctypes
+import logging
+import types
+
+from event_hub import get_default_hub
+
+log = logging.getLogger(__name__)
+
+# ioctl request for exclusive access to an input device: _IOW('E', 0x90, int)
+EVIOCGRAB = 0x40044590
+
+# Linux input_event: long int, long int, unsigned short, unsigned short, unsigned int
+# See https://www.kernel.org/doc/html/v4.12/input/input.html
+INPUT_EVENT = struct.Struct("llHHI")
+INPUT_EVENT_SIZE = INPUT_EVENT.size
+
+# ioctl requests to get/set the autorepeat delay and period in ms: unsigned int[2]
+EVIOCGREP = 0x80084503
+EVIOCSREP = 0x40084503
+KEY_REPEAT = struct.Struct("II")
+
+# Autorepeat delay/period applied while monitoring, so the kernel stops
+# flooding us with repeats of a held key (restored when monitoring stops)
+KEY_REPEAT_MS = 1000
+
+# ioctl request for the key capability bitmap: EVIOCGBIT(EV_KEY, KEY_CNT / 8)
+EVIOCGBIT_KEY = (2 << 30) | (96 << 16) | (ord('E') << 8) | (0x20 + 1)
+
+# inotify_event header: int wd, uint32 mask, uint32 cookie, uint32 len (+ name)
+INOTIFY_EVENT = struct.Struct("iIII")
+IN_ATTRIB = 0x00000004
+IN_CREATE = 0x00000100
+
+# Number of input events drained per read() call
+EVENTS_PER_READ = 32
+
+# Number of Linux key codes (KEY_CNT), the size of the key lookup table
+KEY_CODE_COUNT = 0x300
+
+# Mapping of common keys to their Linux input event codes
+# These codes are standard for most keyboards on Linux
+# (read-only view, shared by every instance and thread)
+KEY_MAP = types.MappingProxyType({
+    'a': 30, 'b': 48, 'c': 46, 'd': 32, 'e': 18, 'f': 33, 'g': 34, 'h': 35, 'i': 23,
+    'j': 36, 'k': 37, 'l': 38, 'm': 50, 'n': 49, 'o': 24, 'p': 25, 'q': 16, 'r': 19,
+    's': 31, 't': 20, 'u': 22, 'v': 47, 'w': 17, 'x': 45, 'y': 21, 'z': 44,
+    '0': 11, '1': 2, '2': 3, '3': 4, '4': 5, '5': 6, '6': 7, '7': 8, '8': 9, '9': 10,
+    'space': 57, 'return': 28, 'enter': 28, 'esc': 1, 'escape': 1,
+    'backspace': 14, 'tab': 15, 'caps': 58, 'capslock': 58,
+    'f1': 59, 'f2': 60, 'f3': 61, 'f4': 62, 'f5': 63,
+    'f6': 64, 'f7': 65, 'f8': 66, 'f9': 67, 'f10': 68
+})
+
+def _build_ascii_key_codes():
+    """Build a 128-byte table of Linux key codes indexed by ASCII code (0 = unmapped)"""
+    table = bytearray(128)
+    for name, code in KEY_MAP.items():
+        if len(name) == 1:
+            table[ord(name)] = code
+            table[ord(name.upper())] = code
+    # Characters typed by the named keys
+    for char, name in ((' ', 'space'), ('\r', 'enter'), ('\n', 'enter'), ('\t', 'tab'),
+                       ('\x1b', 'esc'), ('\x7f', 'backspace'), ('\b', 'backspace')):
+        table[ord(char)] = KEY_MAP[name]
+    return bytes(table)
+
+# Single characters resolve with one byte fetch: ASCII_KEY_CODES[ord(ch)]
+ASCII_KEY_CODES = _build_ascii_key_codes()
+
+def key_code_for(key):
+    """
+    Return the Linux input event code for a key, or None if it is unknown.
+    
+    Args:
+        key: A single character ('w', 'W', ' ') or a key name ('space', 'f1')
+    """
+    if len(key) == 1 and ord(key) < 128:
+        return ASCII_KEY_CODES[ord(key)] or None
+    return KEY_MAP.get(key.lower())
+
+# Common locations for keyboard devices, tried after the kernel-reported keyboards
+KEYBOARD_DEVICES = (
+    "/dev/input/by-path/platform-3f980000.usb-usb-0:1.2:1.0-event-kbd",  # Common Pi keyboard path
+    "/dev/input/by-path/platform-fd500000.pcie-pci-0000:01:00.0-usb-0:1.2:1.0-event-kbd",  # Pi 4 path
+    "/dev/input/by-id/usb-Generic_USB_Keyboard-event-kbd",  # Generic USB keyboard
+)
+
+# File remembering the last keyboard device that could be opened
+KEYBOARD_CACHE_FILE = os.path.expanduser("~/.cache/dillyjumpingdino/kbd_device")
+
+# EV_KEY and EV_REP capability bits: devices with both behave like keyboards
+KEYBOARD_EV_MASK = (1 << 1) | (1 << 20)
+
+def read_cached_keyboard_device():
+    """Return the cached keyboard device path if it still exists, else None"""
+    try:
+        with open(KEYBOARD_CACHE_FILE) as f:
+            device = f.read().strip()
+    except OSError:
+        return None
+    return device if device and os.path.exists(device) else None
+
+def save_keyboard_device(device):
+    """Remember a working keyboard device path for the next start"""
+    try:
+        os.makedirs(os.path.dirname(KEYBOARD_CACHE_FILE), exist_ok=True)
+        with open(KEYBOARD_CACHE_FILE, "w") as f:
+            f.write(device)
+    except OSError as e:
+        print(f"Could not cache keyboard device path: {e}")
+
+def forget_keyboard_device():
+    """Delete the cached keyboard device path, e.g. when it now names another device"""
+    try:
+        os.remove(KEYBOARD_CACHE_FILE)
+    except OSError:
+        pass
+
+def input_event_devices():
+    """List the /dev/input/event* devices that exist, in numeric order"""
+    try:
+        with os.scandir("/dev/input") as entries:
+            names = [entry.name for entry in entries if entry.name.startswith("event")]
+    except OSError:
+        return []
+    names.sort(key=lambda name: int(name[5:]) if name[5:].isdigit() else 0)
+    return [f"/dev/input/{name}" for name in names]
+
+def can_open_device(device):
+    """Check whether an input device can be opened for reading"""
+    # The open itself is the existence and permission test
+    try:
+        fd = os.open(device, os.O_RDONLY | os.O_NONBLOCK)
+    except OSError:
+        return False
+    os.close(fd)
+    return True
+
+def proc_keyboard_devices():
+    """
+    List /dev/input/event* devices that the kernel reports as keyboards.
+    
+    Parses /proc/bus/input/devices once instead of probing event0..event9.
+    """
+    devices = []
+    try:
+        with open("/proc/bus/input/devices") as f:
+            blocks = f.read().split("\n\n")
+    except OSError:
+        return devices
+    
+    for block in blocks:
+        handlers = []
+        ev_bits = 0
+        for line in block.splitlines():
+            if line.startswith("H: Handlers="):
+                handlers = line[len("H: Handlers="):].split()
+            elif line.startswith("B: EV="):
+                ev_bits = int(line[len("B: EV="):], 16)
+        if "kbd" in handlers and ev_bits & KEYBOARD_EV_MASK == KEYBOARD_EV_MASK:
+            devices.extend(f"/dev/input/{h}" for h in handlers if h.startswith("event"))
+    return devices
+
+def watch_input_devices():
+    """
+    Watch /dev/input for new devices with inotify.
+    
+    Returns a non-blocking inotify file descriptor, or None if inotify is not
+    available (hotplugged keyboards are then not picked up).
+    """
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        # IN_ATTRIB as well as IN_CREATE: udev fixes the node's permissions
+        # just after creating it
+        if libc.inotify_add_watch(fd, b"/dev/input", IN_CREATE | IN_ATTRIB) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+def read_new_input_devices(inotify_fd):
+    """Return the /dev/input/event* paths reported by a watch_input_devices() fd"""
+    try:
+        data = os.read(inotify_fd, 4096)
+    except BlockingIOError:
+        return []
+    
+    devices = []
+    offset = 0
+    while offset < len(data):
+        wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+        offset += INOTIFY_EVENT.size
+        name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+        offset += length
+        if name.startswith("event"):
+            devices.append(f"/dev/input/{name}")
+    return devices
+
+def device_has_key(fd, key_code):
+    """Check whether an open input device can report the given key code"""
+    bits = bytearray(96)
+    try:
+        fcntl.ioctl(fd, EVIOCGBIT_KEY, bits)
+    except OSError:
+        return False
+    return bool(bits[key_code // 8] & (1 << (key_code % 8)))
 
 class DirectKeyboardInput:
-    def __init__(self, key='w', callback=None):
+    def __init__(self, key='w', callback=None, grab=False, hub=None):
         """
         Initialize the direct keyboard input handler.
         
         Args:
             key: Key to trigger the action (default is 'w')
             callback: Function to call when key is pressed
+            grab: Take exclusive access to the keyboard (EVIOCGRAB) so no other
+                  program (desktop, terminal) sees its key presses
+            hub: EventHub whose thread reads the keyboard; if None, the shared
+                 process-wide hub is used
         """
         self.key = key.lower()
         self.callback = callback
+        self.grab = grab
+        self.hub = hub
         self.running = False
         self.thread = None
-        self.last_press_time = 0
-        self.debounce_time = 0.3  # 300ms debounce
-        self.key_mapping = self._create_key_mapping()
-        self.key_code = self.key_mapping.get(self.key)
+        self.error_message = None
+        
+        # Keyboards currently being read, fd -> device path
+        self._devices = {}
+        
+        # inotify fd watching /dev/input for hotplugged keyboards
+        self._inotify_fd = None
+        
+        # Original autorepeat settings of open keyboards, fd -> packed (delay, period)
+        self._saved_repeat = {}
+        self.last_press_ns = 0
+        self.debounce_ns = 300_000_000  # 300ms debounce (monotonic clock)
+        self.key_code = key_code_for(self.key)
+        
+        # Lookup table indexed by key code: non-zero for codes that trigger
+        self._active = bytearray(KEY_CODE_COUNT)
         
         if self.key_code is None:
             print(f"Warning: No key code mapping found for '{self.key}'. Key detection may not work.")
-    
-    def _create_key_mapping(self):
-        """Create a mapping of characters to Linux input event codes"""
-        # This is a basic mapping of common keys to their event codes
-        # These codes are standard for most keyboards on Linux
-        return {
-            'a': 30, 'b': 48, 'c': 46, 'd': 32, 'e': 18, 'f': 33, 'g': 34, 'h': 35, 'i': 23,
-            'j': 36, 'k': 37, 'l': 38, 'm': 50, 'n': 49, 'o': 24, 'p': 25, 'q': 16, 'r': 19,
-            's': 31, 't': 20, 'u': 22, 'v': 47, 'w': 17, 'x': 45, 'y': 21, 'z': 44,
-            '0': 11, '1': 2, '2': 3, '3': 4, '4': 5, '5': 6, '6': 7, '7': 8, '8': 9, '9': 10,
-            'space': 57, 'return': 28, 'enter': 28, 'esc': 1, 'escape': 1,
-            'backspace': 14, 'tab': 15, 'caps': 58, 'capslock': 58,
-            'f1': 59, 'f2': 60, 'f3': 61, 'f4': 62, 'f5': 63,
-            'f6': 64, 'f7': 65, 'f8': 66, 'f9': 67, 'f10': 68
-        }
+        else:
+            self._active[self.key_code] = 1
     
     def _find_keyboard_device(self):
         """Find a keyboard input device"""
-        # Common locations for keyboard devices
-        possible_devices = [
-            "/dev/input/by-path/platform-3f980000.usb-usb-0:1.2:1.0-event-kbd",  # Common Pi keyboard path
-            "/dev/input/by-path/platform-fd500000.pcie-pci-0000:01:00.0-usb-0:1.2:1.0-event-kbd",  # Pi 4 path
-            "/dev/input/by-id/usb-Generic_USB_Keyboard-event-kbd",  # Generic USB keyboard
-        ]
+        # Try the device that worked last time before probing. eventN numbers
+        # are reassigned across reboots and replugs, so it must still report our key
+        cached = read_cached_keyboard_device()
+        if cached is not None:
+            if self._device_reports_key(cached):
+                return cached
+            print(f"Cached device {cached} does not report the '{self.key}' key; probing again")
+            forget_keyboard_device()
         
-        # Also try event devices
-        for i in range(10):  # Check event0 through event9
-            possible_devices.append(f"/dev/input/event{i}")
+        # Keyboards reported by the kernel, then common locations for keyboard
+        # devices, then every event device that exists
+        possible_devices = proc_keyboard_devices() + list(KEYBOARD_DEVICES) + input_event_devices()
         
         # Try to open each device
         for device in possible_devices:
-            try:
-                if os.path.exists(device):
-                    # Try to open the device for reading
-                    fd = os.open(device, os.O_RDONLY | os.O_NONBLOCK)
-                    os.close(fd)  # Close it immediately, we just wanted to test
-                    return device
-            except (IOError, PermissionError) as e:
-                continue
+            if can_open_device(device):
+                save_keyboard_device(device)
+                return device
         
         return None
     
-    def _monitor_keyboard(self):
+    def _device_reports_key(self, device):
+        """Return True if device can be opened and can report the trigger key"""
+        if self.key_code is None:
+            # Nothing to check against; keep the old behaviour of trusting the path
+            return True
+        try:
+            fd = os.open(device, os.O_RDONLY | os.O_NONBLOCK)
+        except OSError:
+            return False
+        try:
+            return device_has_key(fd, self.key_code)
+        finally:
+            os.close(fd)
+    
+    def _add_device(self, fd, device):
+        """Start reading an opened keyboard on the hub thread"""
+        self._devices[fd] = device
+        self.hub.register(fd, self._on_keyboard_ready)
+    
+    def _remove_device(self, fd):
+        """Stop reading a keyboard and close it"""
+        if self._devices.pop(fd, None) is None:
+            return
+        self.hub.unregister(fd)
+        # Closing the fd also releases any EVIOCGRAB grab
+        self._restore_repeat(fd)
+        os.close(fd)
+    
+    def _on_keyboard_ready(self, fd):
+        """Hub callback: a keyboard has events waiting"""
+        if fd not in self._devices:
+            return
+        try:
+            data = os.read(fd, INPUT_EVENT_SIZE * EVENTS_PER_READ)
+        except OSError:
+            data = b""
+        if not data:
+            # ENODEV when the keyboard is unplugged
+            print(f"Keyboard device disconnected: {self._devices.get(fd)}")
+            self._remove_device(fd)
+            return
+        self._handle_events(data)
+    
+    def _on_hotplug(self, fd):
+        """Hub callback: devices appeared under /dev/input"""
+        for device in read_new_input_devices(fd):
+            if not self.running or device in self._devices.values():
+                continue
+            new_fd = self._open_device(device, quiet=True)
+            if new_fd is None:
+                continue
+            if self.key_code is not None and device_has_key(new_fd, self.key_code):
+                self._add_device(new_fd, device)
+                save_keyboard_device(device)
+            else:
+                self._restore_repeat(new_fd)
+                os.close(new_fd)
+    
+    def _open_device(self, device, quiet=False):
         """
-        Internal method to monitor keyboard in a separate thread.
-        Uses direct access to input device files.
+        Open a keyboard device for blocking reads.
+        
+        Args:
+            device: Path of the input device
+            quiet: Don't report failures (used for hotplugged devices)
+        
+        Returns the file descriptor, or None if the device could not be opened.
         """
-        # Find a keyboard device
-        keyboard_device = self._find_keyboard_device()
+        try:
+            fd = os.open(device, os.O_RDONLY)
+        except PermissionError:
+            if not quiet:
+                print("Permission denied accessing keyboard device.")
+                print("Try running the script with sudo: sudo python3 direct_keyboard_input.py")
+            return None
+        except OSError as e:
+            if not quiet:
+                print(f"Error opening keyboard device {device}: {e}")
+            return None
         
-        if keyboard_device is None:
-            print("Error: Could not find a keyboard device. Try running with sudo.")
-            return
+        print(f"Using keyboard device: {device}")
         
-        print(f"Using keyboard device: {keyboard_device}")
+        if self.grab:
+            try:
+                fcntl.ioctl(fd, EVIOCGRAB, 1)
+            except OSError as e:
+                print(f"Could not grab keyboard device exclusively: {e}")
         
+        # Slow down the kernel's autorepeat; fails harmlessly on devices
+        # without repeat support
         try:
-            # Open the keyboard device
-            with open(keyboard_device, "rb") as device:
-                # Event format: long int, long int, unsigned short, unsigned short, unsigned int
-                # See https://www.kernel.org/doc/html/v4.12/input/input.html
-                event_size = struct.calcsize("llHHI")
-                event_format = "llHHI"
-                
-                print(f"Monitoring for '{self.key}' key presses...")
-                print(f"Key code to detect: {self.key_code}")
+            self._saved_repeat[fd] = fcntl.ioctl(fd, EVIOCGREP, bytes(KEY_REPEAT.size))
+            fcntl.ioctl(fd, EVIOCSREP, KEY_REPEAT.pack(KEY_REPEAT_MS, KEY_REPEAT_MS))
+        except OSError:
+            self._saved_repeat.pop(fd, None)
+        return fd
+    
+    def _restore_repeat(self, fd):
+        """Put back the autorepeat settings a keyboard had before it was opened"""
+        saved = self._saved_repeat.pop(fd, None)
+        if saved is not None:
+            try:
+                fcntl.ioctl(fd, EVIOCSREP, saved)
+            except OSError:
+                pass
+    
+    def _handle_events(self, data):
+        """Dispatch a buffer of input events read from a keyboard device"""
+        active = self._active
+        
+        # The kernel only ever returns whole events
+        for tv_sec, tv_usec, ev_type, code, value in INPUT_EVENT.iter_unpack(data):
+            # EV_KEY event type is 1, value=1 means key press (0=release, 2=repeat)
+            if ev_type == 1 and value == 1:  # Key press event
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("Key pressed: code=%d, value=%d", code, value)
                 
-                while self.running:
-                    # Use select to check if there's data to read
-                    r, _, _ = select.select([device], [], [], 0.1)
-                    if r:
-                        event = device.read(event_size)
-                        if event:
-                            # Parse the event
-                            (tv_sec, tv_usec, ev_type, code, value) = struct.unpack(event_format, event)
-                            
-                            # EV_KEY event type is 1, value=1 means key press (0=release, 2=repeat)
-                            if ev_type == 1 and value == 1:  # Key press event
-                                print(f"Key pressed: code={code}, value={value}")
-                                
-                                # Check if it's our target key
-                                if code == self.key_code:
-                                    current_time = time.time()
-                                    if current_time - self.last_press_time > self.debounce_time:
-                                        print(f"Key '{self.key}' pressed! Triggering action...")
-                                        self.last_press_time = current_time
-                                        if self.callback:
-                                            try:
-                                                self.callback()
-                                            except Exception as e:
-                                                print(f"Error in key callback: {e}")
-        except PermissionError:
-            print("Permission denied accessing keyboard device.")
-            print("Try running the script with sudo: sudo python3 direct_keyboard_input.py")
-        except Exception as e:
-            print(f"Error monitoring keyboard: {e}")
+                # Check if it's our target key
+                if code < KEY_CODE_COUNT and active[code]:
+                    current_time = time.monotonic_ns()
+                    if current_time - self.last_press_ns > self.debounce_ns:
+                        print(f"Key '{self.key}' pressed! Triggering action...")
+                        self.last_press_ns = current_time
+                        if self.callback:
+                            try:
+                                self.callback()
+                            except Exception:
+                                log.exception("Error in key callback")
     
     def start(self):
         """
-        Start monitoring for keyboard input in a separate thread.
+        Start monitoring for keyboard input.
+        
+        The keyboard is opened here and read by the event hub's thread, which
+        blocks until the kernel delivers key events, a keyboard is plugged in,
+        or another registered input is ready.
+        
+        Returns True if monitoring is running, False if it could not start.
         """
-        if self.thread is not None and self.thread.is_alive():
+        if self.running:
             print("Keyboard monitoring is already running.")
-            return
+            return True
+        
+        if self.hub is None:
+            self.hub = get_default_hub()
         
         self.running = True
-        self.thread = threading.Thread(target=self._monitor_keyboard)
-        self.thread.daemon = True
-        self.thread.start()
+        self.error_message = None
         
-        # Give the thread a moment to initialize
-        time.sleep(0.5)
+        # Watch /dev/input so keyboards plugged in later are picked up too
+        self._inotify_fd = watch_input_devices()
+        
+        # Find a keyboard device
+        keyboard_device = self._find_keyboard_device()
+        if keyboard_device is not None:
+            fd = self._open_device(keyboard_device)
+            if fd is not None:
+                self._add_device(fd, keyboard_device)
+        
+        if not self._devices:
+            if self._inotify_fd is None:
+                self.error_message = "Could not find a keyboard device. Try running with sudo."
+                print(f"Error: {self.error_message}")
+                print(f"Failed to start keyboard monitoring: {self.error_message}")
+                self.running = False
+                return False
+            print("No keyboard device found yet. Waiting for a keyboard to be plugged in...")
+        
+        if self._inotify_fd is not None:
+            self.hub.register(self._inotify_fd, self._on_hotplug)
+        
+        print(f"Monitoring for '{self.key}' key presses...")
+        print(f"Key code to detect: {self.key_code}")
+        
+        self.thread = self.hub.start()
         
         print("\nDirect keyboard input is now active!")
         print(f"Press '{self.key}' on the physical keyboard connected to the Pi to trigger the action.")
         
-        return self.thread
+        return True
     
     def stop(self):
         """
@@ -159,15 +475,18 @@ class DirectKeyboardInput:
         print("Stopping keyboard monitoring...")
         self.running = False
         
-        if self.thread and self.thread.is_alive():
-            try:
-                self.thread.join(timeout=2.0)
-                if self.thread.is_alive():
-                    print("Warning: Keyboard monitoring thread did not exit cleanly.")
-                else:
-                    print("Keyboard monitoring stopped successfully.")
-            except Exception as e:
-                print(f"Error stopping keyboard thread: {e}")
+        try:
+            for fd in list(self._devices):
+                self._remove_device(fd)
+            
+            if self._inotify_fd is not None:
+                self.hub.unregister(self._inotify_fd)
+                os.close(self._inotify_fd)
+                self._inotify_fd = None
+            
+            print("Keyboard monitoring stopped successfully.")
+        except Exception as e:
+            print(f"Error stopping keyboard monitoring: {e}")
 
 # Example usage
 if __name__ == "__main__":
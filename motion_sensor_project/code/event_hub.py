@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Event Hub Module for Raspberry Pi
+Runs a single thread that waits on every input file descriptor at once
+(keyboards, /dev/input hotplug) and dispatches to callbacks, instead of
+one polling thread per input. Callbacks run on that shared thread, so they
+must return quickly; hand long work (a scare) to another thread.
+"""
+import os
+import threading
+import selectors
+import logging
+
+log = logging.getLogger(__name__)
+
+class EventHub:
+    def __init__(self):
+        """
+        Initialize the event hub.
+        
+        Callbacks are registered per file descriptor and are called on the hub
+        thread with the ready fd as their only argument.
+        """
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        
+        # Self-pipe: wakes the blocking select() for registration changes and stop()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+    
+    def register(self, fd, callback, events=selectors.EVENT_READ):
+        """
+        Call callback(fd) on the hub thread whenever fd is ready.
+        
+        Args:
+            fd: File descriptor (or object with fileno()) to watch
+            callback: Function called with the ready fd
+            events: selectors.EVENT_READ and/or selectors.EVENT_WRITE
+        """
+        with self._lock:
+            self._selector.register(fd, events, callback)
+        self._wake()
+    
+    def unregister(self, fd):
+        """Stop watching a file descriptor; unregister before closing it"""
+        with self._lock:
+            try:
+                self._selector.unregister(fd)
+            except (KeyError, ValueError):
+                return
+        self._wake()
+    
+    def _wake(self):
+        """Interrupt the blocking select() so the hub re-reads its fd set"""
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError:
+            pass
+    
+    def _run(self):
+        """Hub thread: block until any fd is ready and dispatch it"""
+        while self.running:
+            # No timeout: the thread sleeps until an fd is ready or _wake() is called
+            ready = self._selector.select()
+            
+            for key, mask in ready:
+                callback = key.data
+                if callback is None:
+                    # Drain the wake-up pipe
+                    try:
+                        while os.read(self._wake_r, 64):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                
+                # The fd may have been unregistered by an earlier callback
+                with self._lock:
+                    if key.fd not in self._selector.get_map():
+                        continue
+                
+                try:
+                    callback(key.fd)
+                except Exception:
+                    log.exception("Error in event hub callback")
+    
+    def start(self):
+        """
+        Start the hub thread if it isn't already running.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return self.thread
+        
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="event-hub")
+        self.thread.daemon = True
+        self.thread.start()
+        return self.thread
+    
+    def stop(self):
+        """
+        Stop the hub thread. Registered fds are left registered.
+        """
+        if not self.running:
+            return
+        
+        self.running = False
+        self._wake()
+        
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+            if self.thread.is_alive():
+                print("Warning: Event hub thread did not exit cleanly.")
+
+# Hub shared by all inputs in this process
+_default_hub = None
+_default_hub_lock = threading.Lock()
+
+def get_default_hub():
+    """Return the process-wide EventHub, starting it on first use"""
+    global _default_hub
+    with _default_hub_lock:
+        if _default_hub is None:
+            _default_hub = EventHub()
+        _default_hub.start()
+        return _default_hub
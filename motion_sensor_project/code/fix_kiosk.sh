@@ -127,24 +127,30 @@ Creating systemd service..."
 cat > /etc/systemd/system/halloween-scare.service << EOF
 [Unit]
 Description=Halloween Scare System
-After=multi-user.target
+After=graphical.target
+Wants=graphical.target
 
 [Service]
-Type=simple
+Type=exec
 User=pi
 WorkingDirectory=$PROJECT_DIR
 Environment=DISPLAY=:0
 ExecStart=/usr/bin/python3 $PROJECT_DIR/code/main.py
 Restart=on-failure
 RestartSec=5
+TimeoutStartSec=infinity
+Nice=-5
+IOSchedulingClass=best-effort
+IOSchedulingPriority=2
 
 [Install]
-WantedBy=multi-user.target
+WantedBy=graphical.target
 EOF
 
 # Reload systemd and enable service
 systemctl daemon-reload
-systemctl enable halloween-scare.service
+# reenable drops the multi-user.target link older versions of this unit installed
+systemctl reenable halloween-scare.service
 echo "Systemd service created and enabled"
 
 # Fix screen blanking
@@ -154,18 +160,14 @@ mkdir -p /etc/xdg/lxsession/LXDE-pi
 cat > /etc/xdg/lxsession/LXDE-pi/autostart << EOF
 @lxpanel --profile LXDE-pi
 @pcmanfm --desktop --profile LXDE-pi
-@xset s off
-@xset -dpms
-@xset s noblank
-@unclutter -idle 0
+@/usr/local/bin/screen_blanking.sh
 EOF
 
-# Create screen blanking prevention script
+# Create screen blanking prevention script (run once per login from the autostart above)
 cat > /usr/local/bin/screen_blanking.sh << EOF
 #!/bin/sh
-xset s off
-xset -dpms
-xset s noblank
+xset s off -dpms s noblank
+unclutter -idle 0 &
 EOF
 chmod +x /usr/local/bin/screen_blanking.sh
 echo "Screen blanking prevention configured"
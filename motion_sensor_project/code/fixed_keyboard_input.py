@@ -7,8 +7,13 @@ potential issues with the 'w' key not working on Raspberry Pi.
 import sys
 import time
 import threading
-import select
+import selectors
 import os
+import logging
+
+from direct_keyboard_input import DirectKeyboardInput
+
+log = logging.getLogger(__name__)
 
 class ImprovedKeyboardTrigger:
     def __init__(self, key='w', callback=None):
@@ -21,15 +26,24 @@ class ImprovedKeyboardTrigger:
         """
         self.key = key
         self.callback = callback
-        self.last_press_time = 0
-        self.debounce_time = 0.3  # 300ms debounce to avoid multiple triggers
+        self.last_press_ns = 0
+        self.debounce_ns = 300_000_000  # 300ms debounce (monotonic clock) to avoid multiple triggers
         self.running = False
         self.thread = None
         self.old_settings = None
         self.fd = None
+        self._wake_r = None
+        self._wake_w = None
         self.initialized = False
         self.error_message = None
         
+        # DirectKeyboardInput doing the work when started with method="direct"
+        self._direct = None
+        
+        # Set by the monitoring thread once it is waiting for key presses
+        # (or has given up), so start_monitoring() doesn't guess with a sleep
+        self._ready = threading.Event()
+        
         # Store both lowercase and uppercase versions of the key
         self.key_lower = key.lower()
         self.key_upper = key.upper()
@@ -37,76 +51,9 @@ class ImprovedKeyboardTrigger:
         # Store ASCII codes for the key
         self.key_code_lower = ord(self.key_lower) if len(self.key_lower) == 1 else None
         self.key_code_upper = ord(self.key_upper) if len(self.key_upper) == 1 else None
-    
-    def _monitor_keyboard_direct(self):
-        """
-        Internal method to monitor keyboard using direct file reading.
-        This is an alternative approach that might work better on some systems.
-        """
-        try:
-            # Try to open the keyboard device directly
-            # This requires appropriate permissions
-            keyboard_device = None
-            
-            # Try different possible keyboard devices
-            possible_devices = [
-                "/dev/input/by-path/platform-3f980000.usb-usb-0:1.2:1.0-event-kbd",  # Common Pi keyboard path
-                "/dev/input/event0",  # First input event device
-                "/dev/input/event1",  # Second input event device
-                "/dev/input/event2",  # Third input event device
-            ]
-            
-            for device in possible_devices:
-                try:
-                    if os.path.exists(device):
-                        keyboard_device = open(device, "rb")
-                        print(f"Successfully opened keyboard device: {device}")
-                        break
-                except (IOError, PermissionError) as e:
-                    print(f"Could not open {device}: {e}")
-            
-            if keyboard_device is None:
-                self.error_message = "Could not open any keyboard device. Try running with sudo."
-                print(self.error_message)
-                return
-            
-            print(f"Monitoring for '{self.key}' key presses using direct device access...")
-            print(f"Press '{self.key}' to trigger the action or Ctrl+C to exit")
-            
-            # Simple parsing of keyboard events
-            # This is a simplified version and may need adjustment for different keyboards
-            while self.running:
-                try:
-                    # Read event (this is a simplified approach)
-                    event = keyboard_device.read(16)  # Basic event size
-                    if event:
-                        # Very basic parsing - this is just for demonstration
-                        # A real implementation would properly parse the input event structure
-                        if len(event) >= 16:  # Ensure we have enough data
-                            # Extract key code (very simplified)
-                            key_code = event[10]  # This position may vary
-                            
-                            # Check if it's our target key
-                            # This is a simplified check and may need adjustment
-                            if key_code == self.key_code_lower or key_code == self.key_code_upper:
-                                current_time = time.time()
-                                if current_time - self.last_press_time > self.debounce_time:
-                                    print(f"Key '{self.key}' pressed! Triggering action...")
-                                    self.last_press_time = current_time
-                                    if self.callback:
-                                        try:
-                                            self.callback()
-                                        except Exception as e:
-                                            print(f"Error in key callback: {e}")
-                except Exception as e:
-                    print(f"Error reading keyboard device: {e}")
-                    time.sleep(1)  # Avoid tight loop if there's an error
-        except Exception as e:
-            self.error_message = f"Error in direct keyboard monitoring: {e}"
-            print(self.error_message)
-        finally:
-            if keyboard_device:
-                keyboard_device.close()
+        
+        # Bytes that trigger the action when read from stdin
+        self.trigger_bytes = frozenset(c for c in (self.key_code_lower, self.key_code_upper) if c is not None)
     
     def _monitor_keyboard_stdin(self):
         """
@@ -139,45 +86,62 @@ class ImprovedKeyboardTrigger:
             print(f"Monitoring for '{self.key}' key presses...")
             print(f"Press '{self.key}' to trigger the action or Ctrl+C to exit")
             
-            while self.running:
-                try:
-                    # Wait for input with timeout
-                    r, _, _ = select.select([self.fd], [], [], 0.1)
-                    if r:
-                        char = sys.stdin.read(1)
-                        
-                        # Debug output to see what key was pressed
-                        key_code = ord(char)
-                        if key_code < 32 or key_code > 126:
-                            print(f"Debug: Non-printable key pressed, code: {key_code}")
-                        else:
-                            print(f"Debug: Key pressed: '{char}' (code: {key_code})")
-                        
-                        # Check for both lowercase and uppercase versions of the key
-                        if char.lower() == self.key_lower:
-                            current_time = time.time()
-                            if current_time - self.last_press_time > self.debounce_time:
-                                print(f"Key '{self.key}' pressed! Triggering action...")
-                                self.last_press_time = current_time
-                                if self.callback:
-                                    try:
-                                        self.callback()
-                                    except Exception as e:
-                                        print(f"Error in key callback: {e}")
+            # Block until stdin has input or stop_monitoring() writes to the
+            # wake-up pipe; there is no polling timeout
+            selector = selectors.DefaultSelector()
+            selector.register(self.fd, selectors.EVENT_READ)
+            selector.register(self._wake_r, selectors.EVENT_READ)
+            
+            self._ready.set()
+            
+            try:
+                while self.running:
+                    try:
+                        ready = [key.fd for key, _ in selector.select()]
+                        if self._wake_r in ready or not self.running:
+                            break
                         
-                        # Exit if Ctrl+C is pressed
-                        if char == '\x03':
-                            print("Keyboard monitoring stopped (Ctrl+C).")
-                            self.running = False
+                        # Raw mode: read whatever keystrokes are waiting at once
+                        data = os.read(self.fd, 64)
+                        if not data:
                             break
-                except Exception as e:
-                    print(f"Error reading keyboard input: {e}")
-                    time.sleep(1)  # Avoid tight loop if there's an error
+                        
+                        for key_code in data:
+                            # Debug output to see what key was pressed
+                            if log.isEnabledFor(logging.DEBUG):
+                                if key_code < 32 or key_code > 126:
+                                    log.debug("Non-printable key pressed, code: %d", key_code)
+                                else:
+                                    log.debug("Key pressed: '%c' (code: %d)", key_code, key_code)
+                            
+                            # Check for both lowercase and uppercase versions of the key
+                            if key_code in self.trigger_bytes:
+                                current_time = time.monotonic_ns()
+                                if current_time - self.last_press_ns > self.debounce_ns:
+                                    print(f"Key '{self.key}' pressed! Triggering action...")
+                                    self.last_press_ns = current_time
+                                    if self.callback:
+                                        try:
+                                            self.callback()
+                                        except Exception:
+                                            log.exception("Error in key callback")
+                            
+                            # Exit if Ctrl+C is pressed
+                            if key_code == 3:
+                                print("Keyboard monitoring stopped (Ctrl+C).")
+                                self.running = False
+                                break
+                    except Exception:
+                        log.exception("Error reading keyboard input")
+                        time.sleep(1)  # Avoid tight loop if there's an error
+            finally:
+                selector.close()
         except Exception as e:
             self.error_message = f"Error in keyboard monitoring thread: {e}"
             print(self.error_message)
         finally:
             self.cleanup()
+            self._ready.set()
     
     def start_monitoring(self, method="stdin"):
         """
@@ -186,11 +150,12 @@ class ImprovedKeyboardTrigger:
         Args:
             method: The method to use for keyboard monitoring.
                    "stdin" uses the standard input approach.
-                   "direct" tries to access the keyboard device directly.
+                   "direct" reads the keyboard device directly through
+                   DirectKeyboardInput (may require sudo).
         
         Returns True if monitoring started successfully, False otherwise.
         """
-        if self.thread is not None and self.thread.is_alive():
+        if self.running and (self._direct is not None or (self.thread is not None and self.thread.is_alive())):
             print("Keyboard monitoring is already running.")
             return True
             
@@ -198,17 +163,24 @@ class ImprovedKeyboardTrigger:
         self.error_message = None
         self.initialized = False
         
-        # Create and start the monitoring thread
         if method == "direct":
-            self.thread = threading.Thread(target=self._monitor_keyboard_direct)
-        else:
-            self.thread = threading.Thread(target=self._monitor_keyboard_stdin)
-            
+            return self._start_direct()
+        
+        self._ready.clear()
+        
+        # Self-pipe used by stop_monitoring() to wake the blocking stdin wait
+        if self._wake_r is None:
+            self._wake_r, self._wake_w = os.pipe()
+        
+        # Create and start the monitoring thread
+        self.thread = threading.Thread(target=self._monitor_keyboard_stdin)
         self.thread.daemon = True
         self.thread.start()
         
-        # Give the thread a moment to initialize
-        time.sleep(0.5)
+        # Wait until the thread is reading keys (or has failed)
+        if not self._ready.wait(timeout=2.0):
+            print("Failed to start keyboard monitoring: timed out waiting for the keyboard")
+            return False
         
         # Check if initialization was successful
         if self.error_message is not None:
@@ -222,16 +194,50 @@ class ImprovedKeyboardTrigger:
         
         return True
     
+    def _start_direct(self):
+        """
+        Monitor the keyboard device directly by delegating to DirectKeyboardInput.
+        
+        Returns True if monitoring started successfully, False otherwise.
+        """
+        self._direct = DirectKeyboardInput(self.key, self.callback)
+        self._direct.debounce_ns = self.debounce_ns
+        self._direct.start()
+        
+        if not self._direct.running:
+            self.error_message = self._direct.error_message or "Could not start direct keyboard monitoring."
+            self._direct = None
+            self.running = False
+            return False
+        
+        self.thread = self._direct.thread
+        self.initialized = True
+        return True
+    
     def stop_monitoring(self):
         """
         Stop monitoring for keyboard input.
         """
         if not self.running:
             return
+        
+        if self._direct is not None:
+            self._direct.stop()
+            self._direct = None
+            self.thread = None
+            self.running = False
+            return
             
         print("Stopping keyboard monitoring...")
         self.running = False
         
+        # Wake the stdin monitoring thread out of its blocking wait
+        if self._wake_w is not None:
+            try:
+                os.write(self._wake_w, b"x")
+            except OSError:
+                pass
+        
         if self.thread and self.thread.is_alive():
             try:
                 self.thread.join(timeout=1.0)
@@ -241,6 +247,12 @@ class ImprovedKeyboardTrigger:
                     print("Keyboard monitoring stopped successfully.")
             except Exception as e:
                 print(f"Error stopping keyboard thread: {e}")
+        
+        # The pipe is recreated on the next start_monitoring()
+        if self._wake_r is not None and not (self.thread and self.thread.is_alive()):
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self._wake_r = self._wake_w = None
     
     def cleanup(self):
         """
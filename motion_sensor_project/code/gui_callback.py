@@ -1,11 +1,18 @@
 # This file is used to communicate between the GUI and the main program
 # It provides a way for the GUI to call the button_pressed function in main.py
 
-# The callback function will be set by main.py
-button_callback = None
+# The callback function will be set by main.py. It is kept in a one-element
+# list so registering a new callback is a single atomic item assignment and
+# readers never need a global statement or a lock.
+_slot = [None]
 
 def register_callback(callback_function):
     """Register the callback function from main.py"""
-    global button_callback
-    button_callback = callback_function
+    _slot[0] = callback_function
     print("GUI callback registered successfully")
+
+def fire(*args, **kwargs):
+    """Call the registered callback, if any, and return its result"""
+    callback = _slot[0]
+    if callback is not None:
+        return callback(*args, **kwargs)
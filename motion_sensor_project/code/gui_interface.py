@@ -10,8 +10,19 @@ from tkinter import font as tkfont
 import threading
 import time
 
-# Path to a callback file that will be imported by main.py
-CALLBACK_PATH = None  # Will be set dynamically
+# event.state bits for Control (0x4) and Alt/Mod1 (0x8)
+_MOD_CTRL_ALT = 0x4 | 0x8
+
+# Tk fonts already created, keyed by (root, family, size, weight)
+_FONT_CACHE = {}
+
+def _get_font(root, family, size, weight="normal"):
+    """Return a cached tkfont.Font; each new Font is a round-trip to the Tk interpreter"""
+    key = (root, family, size, weight)
+    font = _FONT_CACHE.get(key)
+    if font is None:
+        font = _FONT_CACHE[key] = tkfont.Font(root=root, family=family, size=size, weight=weight)
+    return font
 
 class HalloweenScareGUI:
     def __init__(self, root, button_callback=None):
@@ -31,9 +42,8 @@ class HalloweenScareGUI:
         self.root.title("Feed The Beast")
         self.root.attributes('-fullscreen', True)  # Fullscreen for TFT display
         
-        # Get screen dimensions
-        screen_width = self.root.winfo_screenwidth()
-        screen_height = self.root.winfo_screenheight()
+        # Get screen width once; every size below is derived from it
+        self.screen_width = screen_width = self.root.winfo_screenwidth()
         
         # Set background color to dark
         self.root.configure(bg='black')
@@ -52,7 +62,7 @@ class HalloweenScareGUI:
         
         # Adjust font size based on screen width
         font_size = min(int(screen_width / 25), 48)  # Cap at 48pt
-        button_font = tkfont.Font(family="Arial", size=font_size, weight="bold")
+        button_font = _get_font(self.root, "Arial", font_size, "bold")
         
         # Create button frame to center the button
         button_frame = tk.Frame(self.main_frame, bg='black')
@@ -77,7 +87,7 @@ class HalloweenScareGUI:
         
         # Add a status label with size based on screen width
         status_font_size = min(int(screen_width / 40), 24)  # Cap at 24pt
-        status_font = tkfont.Font(family="Arial", size=status_font_size)
+        status_font = _get_font(self.root, "Arial", status_font_size)
         
         # Create a frame for the status label
         status_frame = tk.Frame(self.main_frame, bg='black')
@@ -95,8 +105,8 @@ class HalloweenScareGUI:
         
         # No visible exit button - but add a hidden key sequence for developers
         # This requires pressing Ctrl+Alt+Q to exit (unlikely to be pressed accidentally)
-        self.key_sequence = []
-        self.root.bind('<KeyPress>', self._check_dev_exit_sequence)
+        # Bound to that exact chord, not every <KeyPress>; no keystroke history is kept
+        self.root.bind('<Control-Alt-KeyPress-q>', self._check_dev_exit_sequence)
         
     def on_button_press(self):
         """Handle button press event"""
@@ -115,7 +125,7 @@ class HalloweenScareGUI:
         else:
             # If no callback, just simulate a button press
             print("GUI Button pressed! (No callback registered)")
-            self._reset_button_after_delay()
+            self._schedule_reset()
     
     def _trigger_callback(self):
         """Trigger the callback and reset button after"""
@@ -124,12 +134,11 @@ class HalloweenScareGUI:
         except Exception as e:
             print(f"Error in button callback: {e}")
         finally:
-            self._reset_button_after_delay()
+            self._schedule_reset()
     
-    def _reset_button_after_delay(self):
-        """Reset button after cooldown period"""
-        time.sleep(self.cooldown_time)
-        self.root.after(0, self._reset_button)
+    def _schedule_reset(self):
+        """Reset button after cooldown period, using the Tk event loop's timer"""
+        self.root.after(int(self.cooldown_time * 1000), self._reset_button)
     
     def _reset_button(self):
         """Reset button to original state"""
@@ -139,12 +148,12 @@ class HalloweenScareGUI:
     
     def _check_dev_exit_sequence(self, event):
         """Check for developer exit key sequence (Ctrl+Alt+Q)"""
-        # Check if Ctrl and Alt are pressed
-        ctrl = (event.state & 0x4) != 0  # Control key
-        alt = (event.state & 0x8) != 0   # Alt key
+        # Almost every key event is not 'q', so reject on keysym first
+        if event.keysym != 'q':
+            return
         
         # If Ctrl+Alt+Q is pressed, exit the application
-        if ctrl and alt and event.keysym == 'q':
+        if (event.state & _MOD_CTRL_ALT) == _MOD_CTRL_ALT:
             print("Developer exit sequence detected")
             self.exit_application()
     
@@ -153,42 +162,37 @@ class HalloweenScareGUI:
         self.root.destroy()
         sys.exit(0)
 
-def create_gui_callback_file(callback_file_path, button_callback_name):
-    """
-    Create a file that will be imported by main.py to get the GUI callback
-    This allows the GUI to trigger the button_pressed function in main.py
-    """
-    with open(callback_file_path, 'w') as f:
-        f.write(f"""# This file is auto-generated by gui_interface.py
-# It provides a way for the GUI to call the button_pressed function in main.py
-
-# The callback function will be set by main.py
-{button_callback_name} = None
-
-def register_callback(callback_function):
-    \"\"\"Register the callback function from main.py\"\"\"
-    global {button_callback_name}
-    {button_callback_name} = callback_function
-    print("GUI callback registered successfully")
-""")
+# (DISPLAY value, probe result) from the last Tk probe
+_display_available = None
 
 def is_display_available():
     """
     Check if a display server is available for GUI
+    
+    The Tk probe result is cached per DISPLAY value, so repeated calls
+    don't open a new X connection each time.
     """
-    import os
+    global _display_available
     
     # Check for DISPLAY environment variable
-    if 'DISPLAY' not in os.environ:
+    display = os.environ.get('DISPLAY')
+    if not display:
         return False
     
-    # Try to initialize Tk
+    if _display_available is not None and _display_available[0] == display:
+        return _display_available[1]
+    
+    # Try to initialize Tk; withdraw() keeps the probe window from being mapped
     try:
         test_root = tk.Tk()
+        test_root.withdraw()
         test_root.destroy()
-        return True
+        available = True
     except Exception:
-        return False
+        available = False
+    
+    _display_available = (display, available)
+    return available
 
 def run_gui(button_callback=None):
     """
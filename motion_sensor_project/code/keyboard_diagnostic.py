@@ -4,7 +4,6 @@ Keyboard Diagnostic Tool for Halloween Scare System
 This script helps diagnose issues with keyboard input on the Raspberry Pi.
 """
 import sys
-import time
 import os
 import termios
 import tty
@@ -37,23 +36,28 @@ def test_raw_key_input():
         print("Now press keys (including 'w') to see their codes...")
         print("Press Ctrl+C to exit")
         
-        while True:
+        done = False
+        while not done:
             # Wait for input with timeout
             r, _, _ = select.select([fd], [], [], 0.1)
             if r:
-                char = sys.stdin.read(1)
-                key_code = ord(char)
+                # Take every byte already queued in one unbuffered read
+                data = os.read(fd, 64)
                 
-                # Print the key info
-                if key_code == 119 or key_code == 87:  # 'w' or 'W'
-                    print(f"\n>>> KEY PRESSED: '{char}' (ASCII: {key_code}) - THIS IS THE W KEY! <<<")
-                elif key_code < 32:
-                    print(f"Key pressed: Control character (ASCII: {key_code})")
-                    if key_code == 3:  # Ctrl+C
-                        print("Ctrl+C detected, exiting...")
-                        break
-                else:
-                    print(f"Key pressed: '{char}' (ASCII: {key_code})")
+                for key_code in data:
+                    char = chr(key_code)
+                    
+                    # Print the key info
+                    if key_code == 119 or key_code == 87:  # 'w' or 'W'
+                        print(f"\n>>> KEY PRESSED: '{char}' (ASCII: {key_code}) - THIS IS THE W KEY! <<<")
+                    elif key_code < 32:
+                        print(f"Key pressed: Control character (ASCII: {key_code})")
+                        if key_code == 3:  # Ctrl+C
+                            print("Ctrl+C detected, exiting...")
+                            done = True
+                            break
+                    else:
+                        print(f"Key pressed: '{char}' (ASCII: {key_code})")
                     
     except Exception as e:
         print(f"\nError in raw keyboard test: {e}")
@@ -71,8 +75,12 @@ def test_keyboard_trigger():
         # Import the KeyboardTrigger class
         from motion_sensor import KeyboardTrigger
         
+        # Set by the callback so the debug loop sleeps until a key arrives
+        key_event = threading.Event()
+        
         # Define a simple callback
         def key_callback():
+            key_event.set()
             print("\n>>> W KEY DETECTED! CALLBACK TRIGGERED! <<<\n")
         
         # Create a keyboard trigger for 'w' key
@@ -99,8 +107,9 @@ def test_keyboard_trigger():
         print("\nStarting debug loop to check key presses...")
         try:
             while True:
-                time.sleep(0.1)
-                if kt.is_key_pressed():
+                # Timeout only keeps Ctrl+C responsive; no polling of the trigger
+                if key_event.wait(timeout=1.0):
+                    key_event.clear()
                     print("Key press detected in debug loop!")
         except KeyboardInterrupt:
             print("\nTest terminated by user")
@@ -125,8 +134,12 @@ def test_simple_keyboard():
         # Import the SimpleKeyboardInput class
         from keyboard_input import SimpleKeyboardInput
         
+        # Set by the callback so the wait loop sleeps until a key arrives
+        key_event = threading.Event()
+        
         # Define a simple callback
         def key_callback():
+            key_event.set()
             print("\n>>> W KEY DETECTED! CALLBACK TRIGGERED! <<<\n")
         
         # Create a simple keyboard input for 'w' key
@@ -143,8 +156,10 @@ def test_simple_keyboard():
         print("Press Ctrl+C to exit")
         
         try:
-            while True:
-                time.sleep(1)
+            # Wait for key events until the input loop ends ('exit') or Ctrl+C
+            while ski.running:
+                if key_event.wait(timeout=1.0):
+                    key_event.clear()
         except KeyboardInterrupt:
             print("\nTest terminated by user")
         finally:
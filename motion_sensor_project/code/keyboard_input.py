@@ -3,8 +3,11 @@
 Alternative keyboard input module for Halloween Scare System
 This module provides a simpler keyboard input method that works in more environments
 """
+import os
 import threading
 import time
+import select
+import sys
 
 class SimpleKeyboardInput:
     def __init__(self, key='w', callback=None):
@@ -16,42 +19,81 @@ class SimpleKeyboardInput:
             callback: Function to call when key is pressed
         """
         self.key = key
+        self._key_lower = key.lower()  # Compared against each whole input line
         self.callback = callback
         self.running = False
         self.thread = None
         self.last_press_time = 0
         self.debounce_time = 0.3  # 300ms debounce
     
+    def _handle_line(self, line):
+        """
+        Act on one line of input.
+        
+        Returns False if the line was the exit command.
+        """
+        user_input = line.strip().lower()
+        
+        # Check for exit command
+        if user_input == 'exit':
+            print("Keyboard input stopped.")
+            return False
+        
+        # Check for trigger key
+        if user_input == self._key_lower:
+            current_time = time.time()
+            if current_time - self.last_press_time > self.debounce_time:
+                print(f"Key '{self.key}' detected! Triggering action...")
+                self.last_press_time = current_time
+                if self.callback:
+                    try:
+                        self.callback()
+                    except Exception as e:
+                        print(f"Error in key callback: {e}")
+        return True
+    
     def _input_loop(self):
         """
         Internal method to monitor for keyboard input in a separate thread.
-        Uses standard input() which works in more environments but requires Enter key.
+        Uses line-buffered stdin which works in more environments but requires Enter key.
+        Stdin is polled with select() so the loop notices stop() within 0.2s.
         """
         print(f"\nSimple keyboard input is now active!")
         print(f"Type '{self.key}' and press Enter to trigger the action.")
         print("Type 'exit' to quit.\n")
         
+        prompt = f"Press '{self.key}' and Enter to trigger (or 'exit'): "
+        prompted = False
+        fd = sys.stdin.fileno()
+        # Bytes read past the last newline; read straight from the fd, since
+        # sys.stdin's own buffer would hide lines from select()
+        pending = b""
+        
         while self.running:
             try:
-                user_input = input(f"Press '{self.key}' and Enter to trigger (or 'exit'): ")
+                if not prompted:
+                    print(prompt, end='', flush=True)
+                    prompted = True
                 
-                # Check for exit command
-                if user_input.lower() == 'exit':
-                    print("Keyboard input stopped.")
+                # Wait briefly for input so self.running is re-checked regularly
+                ready, _, _ = select.select([fd], [], [], 0.2)
+                if not ready:
+                    continue
+                
+                chunk = os.read(fd, 1024)
+                if not chunk:
+                    # EOF: stdin was closed, nothing more to read
+                    print("\nKeyboard input stopped (stdin closed).")
                     self.running = False
                     break
                 
-                # Check for trigger key
-                if self.key.lower() in user_input.lower():
-                    current_time = time.time()
-                    if current_time - self.last_press_time > self.debounce_time:
-                        print(f"Key '{self.key}' detected! Triggering action...")
-                        self.last_press_time = current_time
-                        if self.callback:
-                            try:
-                                self.callback()
-                            except Exception as e:
-                                print(f"Error in key callback: {e}")
+                # Handle every complete line that arrived
+                *lines, pending = (pending + chunk).split(b"\n")
+                for line in lines:
+                    prompted = False
+                    if not self._handle_line(line.decode(errors='replace')):
+                        self.running = False
+                        break
             except KeyboardInterrupt:
                 print("\nKeyboard input stopped (Ctrl+C).")
                 self.running = False
@@ -63,16 +105,18 @@ class SimpleKeyboardInput:
     def start(self):
         """
         Start monitoring for keyboard input in a separate thread.
+        
+        Returns True once the input thread is running.
         """
         if self.thread is not None and self.thread.is_alive():
             print("Keyboard input is already running.")
-            return
+            return True
         
         self.running = True
         self.thread = threading.Thread(target=self._input_loop)
         self.thread.daemon = True
         self.thread.start()
-        return self.thread
+        return True
     
     def stop(self):
         """
@@ -80,8 +124,9 @@ class SimpleKeyboardInput:
         """
         self.running = False
         if self.thread and self.thread.is_alive():
-            print("Waiting for keyboard input thread to exit...")
-            self.thread.join(timeout=2.0)
+            # The input loop re-checks self.running every 0.2s, but the callback
+            # runs on this thread and may still be busy with a scare
+            self.thread.join(timeout=1.0)
             if self.thread.is_alive():
                 print("Warning: Keyboard input thread did not exit cleanly.")
             else:
@@ -5,37 +5,226 @@ This script sets up the Raspberry Pi to run the GUI in kiosk mode on startup
 """
 import os
 import sys
-import subprocess
-import argparse
+import time
+# subprocess, argparse and concurrent.futures are imported inside the functions that use them,
+# so light paths like --enable don't load them
+import hashlib
+from pathlib import Path
 
 # Get the directory of this script
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
 
+# Install locations, resolved once at import
+MAIN_PY = os.path.join(PROJECT_DIR, 'code/main.py')
+AUTOSTART_DIR = os.path.expanduser('~/.config/autostart')
+AUTOSTART_FILE = os.path.join(AUTOSTART_DIR, 'halloween_scare.desktop')
+SERVICE_PATH = "/etc/systemd/system/halloween-scare.service"
+SCREEN_BLANKING_PATH = "/usr/local/bin/screen_blanking.sh"
+
+# LXDE session autostart files, for the different Raspberry Pi OS versions
+LXDE_AUTOSTART_PATHS = [
+    "/etc/xdg/lxsession/LXDE-pi/autostart",
+    os.path.expanduser("~/.config/lxsession/LXDE-pi/autostart"),
+    "/etc/xdg/lxsession/LXDE/autostart",
+    os.path.expanduser("~/.config/lxsession/LXDE/autostart")
+]
+
+# Packages needed for the kiosk display
+KIOSK_PACKAGES = ["xserver-xorg", "x11-xserver-utils", "lightdm", "unclutter", "python3-tk"]
+
+# apt's package cache; if it was refreshed recently, "apt-get update" is skipped
+APT_PKGCACHE = "/var/cache/apt/pkgcache.bin"
+APT_CACHE_MAX_AGE = 3600  # seconds
+
+# Records a fingerprint of the last completed setup, so unchanged re-runs are skipped
+SETUP_STAMP = "/var/lib/halloween-scare/setup.stamp"
+
+# Every file setup_kiosk_mode installs; a re-run is only skipped while all of them exist
+INSTALLED_PATHS = [SERVICE_PATH, SCREEN_BLANKING_PATH, AUTOSTART_FILE, *LXDE_AUTOSTART_PATHS]
+
+# LXDE session autostart: desktop plus the screen blanking script
+AUTOSTART_CONTENT = f"""@lxpanel --profile LXDE-pi
+@pcmanfm --desktop --profile LXDE-pi
+@{SCREEN_BLANKING_PATH}
+"""
+
+# One xset call takes all the options; started once per login from the autostart
+SCREEN_BLANKING_SCRIPT = """#!/bin/sh
+xset s off -dpms s noblank
+unclutter -idle 0 &
+"""
+
+SERVICE_CONTENT = f"""[Unit]
+Description=Halloween Scare System
+After=graphical.target
+Wants=graphical.target
+
+[Service]
+Type=exec
+User=pi
+WorkingDirectory={PROJECT_DIR}
+Environment=DISPLAY=:0
+ExecStart=/usr/bin/python3 {MAIN_PY}
+Restart=on-failure
+RestartSec=5
+TimeoutStartSec=infinity
+Nice=-5
+IOSchedulingClass=best-effort
+IOSchedulingPriority=2
+
+[Install]
+WantedBy=graphical.target
+"""
+
+# User autostart entry that opens the system in a terminal
+DESKTOP_CONTENT = f"""[Desktop Entry]
+Type=Application
+Name=Halloween Scare System
+Comment=Starts the Halloween Scare System in kiosk mode
+Exec=lxterminal -e 'bash -c "cd {PROJECT_DIR} && DISPLAY=:0 sudo python3 code/main.py; bash"'
+Terminal=false
+X-GNOME-Autostart-enabled=true
+"""
+
+def _shell_step(command):
+    """Shell line that runs command and, if it fails, reports it on stderr and sets rc=1"""
+    return f'{command} || {{ echo "{command} failed" >&2; rc=1; }}'
+
+# Every privileged step of disabling kiosk mode, run by a single sudo shell.
+# Each step runs even if an earlier one failed; the exit status is 1 if any did
+DISABLE_COMMANDS = "\n".join([
+    "rc=0",
+    f"if [ -e {SERVICE_PATH} ]; then",
+    _shell_step("systemctl stop halloween-scare.service"),
+    _shell_step("systemctl disable halloween-scare.service"),
+    "fi",
+    _shell_step(f"rm -f {SERVICE_PATH}"),
+    _shell_step("systemctl daemon-reload"),
+    _shell_step(f"rm -f {SCREEN_BLANKING_PATH}"),
+    _shell_step(f"rm -f {SETUP_STAMP}"),
+    "exit $rc",
+])
+
+def setup_fingerprint():
+    """Hash of everything setup_kiosk_mode installs; changes whenever any of it does"""
+    digest = hashlib.sha256()
+    for part in (AUTOSTART_CONTENT, SCREEN_BLANKING_SCRIPT, SERVICE_CONTENT, DESKTOP_CONTENT,
+                 " ".join(sorted(KIOSK_PACKAGES))):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def read_setup_stamp():
+    """Return the fingerprint stored by the last completed setup, or None"""
+    try:
+        with open(SETUP_STAMP) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def setup_is_current(fingerprint):
+    """
+    Return True if setup can be skipped.
+    
+    That needs the stamp to match fingerprint, every installed file to still
+    exist and the service to still be enabled.
+    """
+    import subprocess
+    
+    if read_setup_stamp() != fingerprint:
+        return False
+    if not all(os.path.exists(path) for path in INSTALLED_PATHS):
+        return False
+    try:
+        result = subprocess.run(["systemctl", "is-enabled", "--quiet", "halloween-scare.service"], check=False)
+    except OSError:
+        return False
+    return result.returncode == 0
+
+def install_file(path, data, mode=None):
+    """
+    Atomically install a file: write a temp file beside it, then rename it over path.
+    
+    The temp file is in the target directory, so the rename never turns into
+    a cross-filesystem copy, and readers never see a half-written file.
+    
+    Args:
+        path: Destination file
+        data: File contents (bytes)
+        mode: Permission bits to set before the file goes live (e.g. 0o755)
+    """
+    directory, name = os.path.split(path)
+    tmp = os.path.join(directory, f".{name}.tmp")
+    Path(tmp).write_bytes(data)
+    if mode is not None:
+        os.chmod(tmp, mode)
+    os.replace(tmp, path)
+
+def write_setup_stamp(fingerprint):
+    """Store the fingerprint of a completed setup"""
+    os.makedirs(os.path.dirname(SETUP_STAMP), exist_ok=True)
+    install_file(SETUP_STAMP, f"{fingerprint}\n".encode("utf-8"))
+
+def link_file(source, path):
+    """
+    Replace path with a hard link to source.
+    
+    Args:
+        source: Existing file to link to
+        path: Path to create (an existing file there is replaced atomically)
+    
+    Returns False if the link can't be made (e.g. different filesystems),
+    so the caller can write a copy instead.
+    """
+    tmp = path + ".tmp"
+    try:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        os.link(source, tmp)
+        os.replace(tmp, path)
+        return True
+    except OSError as e:
+        print(f"Could not link {path} to {source} ({e}); writing a copy")
+        return False
+
+def packages_installed(packages):
+    """Return True if dpkg reports every package as installed (one dpkg-query call)"""
+    import subprocess
+    
+    try:
+        result = subprocess.run(["dpkg-query", "-W", "-f=${Package} ${Status}\n", *packages],
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=False)
+    except OSError:
+        return False
+    
+    installed = {line.split()[0] for line in result.stdout.splitlines()
+                 if line.endswith(" installed")}
+    return installed.issuperset(packages)
+
 def disable_kiosk_mode():
     """Disable kiosk mode by removing autostart files and systemd service"""
+    import subprocess
+    
     try:
-        # Disable and remove systemd service
+        # Disable and remove systemd service and the screen blanking script
         print("Disabling systemd service...")
         try:
-            subprocess.run(["sudo", "systemctl", "stop", "halloween-scare.service"], check=False)
-            subprocess.run(["sudo", "systemctl", "disable", "halloween-scare.service"], check=False)
-            subprocess.run(["sudo", "rm", "/etc/systemd/system/halloween-scare.service"], check=False)
-            subprocess.run(["sudo", "systemctl", "daemon-reload"], check=False)
-            print("Systemd service disabled and removed")
+            had_blanking_script = os.path.exists(SCREEN_BLANKING_PATH)
+            result = subprocess.run(["sudo", "sh", "-c", DISABLE_COMMANDS],
+                                    capture_output=True, text=True, check=False)
+            if result.returncode != 0:
+                # stderr has a line per failed step, followed by the tools' own messages
+                print(f"Error disabling systemd service: {(result.stderr or result.stdout).strip()}")
+            else:
+                print("Systemd service disabled and removed")
+                if had_blanking_script:
+                    print("Removed screen blanking script")
         except Exception as e:
             print(f"Error disabling systemd service: {e}")
         
         # Remove autostart file
         create_autostart_file(False)
-        
-        # Remove screen blanking script
-        try:
-            if os.path.exists("/usr/local/bin/screen_blanking.sh"):
-                subprocess.run(["sudo", "rm", "/usr/local/bin/screen_blanking.sh"], check=False)
-                print("Removed screen blanking script")
-        except Exception as e:
-            print(f"Error removing screen blanking script: {e}")
             
         print("\nKiosk mode has been disabled.")
         print("The Halloween Scare System will no longer start automatically on boot.")
@@ -46,132 +235,158 @@ def disable_kiosk_mode():
 
 def create_autostart_file(enable=True):
     """Create or remove the autostart file for the kiosk mode"""
-    # Define the autostart directory and file
-    autostart_dir = os.path.expanduser('~/.config/autostart')
-    autostart_file = os.path.join(autostart_dir, 'halloween_scare.desktop')
-    
     if enable:
         # Create the autostart directory if it doesn't exist
-        os.makedirs(autostart_dir, exist_ok=True)
-        
-        # Create the desktop file content
-        desktop_content = f"""[Desktop Entry]
-Type=Application
-Name=Halloween Scare System
-Comment=Starts the Halloween Scare System in kiosk mode
-Exec=lxterminal -e 'bash -c "cd {PROJECT_DIR} && DISPLAY=:0 sudo python3 code/main.py; bash"'
-Terminal=false
-X-GNOME-Autostart-enabled=true
-"""
+        os.makedirs(AUTOSTART_DIR, exist_ok=True)
         
         # Write the desktop file
-        with open(autostart_file, 'w') as f:
-            f.write(desktop_content)
+        Path(AUTOSTART_FILE).write_bytes(DESKTOP_CONTENT.encode("utf-8"))
         
-        print(f"Autostart file created at: {autostart_file}")
+        print(f"Autostart file created at: {AUTOSTART_FILE}")
         print("The Halloween Scare System will now start automatically on boot.")
     else:
         # Remove the autostart file if it exists
-        if os.path.exists(autostart_file):
-            os.remove(autostart_file)
-            print(f"Autostart file removed: {autostart_file}")
+        if os.path.exists(AUTOSTART_FILE):
+            os.remove(AUTOSTART_FILE)
+            print(f"Autostart file removed: {AUTOSTART_FILE}")
         else:
             print("No autostart file found.")
 
+def write_lxde_autostart():
+    """Write the LXDE autostart file to every location; returns True if any succeeded"""
+    # Same bytes for every location, so encode once
+    autostart_bytes = AUTOSTART_CONTENT.encode("utf-8")
+    
+    # The root-owned /etc/xdg copies share one inode. Per-user files are always
+    # separate files (install_file also breaks an old link), so editing a
+    # user's autostart never changes the system-wide one
+    system_source = None
+    created = False
+    for path in LXDE_AUTOSTART_PATHS:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            system_wide = path.startswith("/etc/")
+            if not (system_wide and system_source is not None and link_file(system_source, path)):
+                install_file(path, autostart_bytes, 0o644)
+            if system_wide and system_source is None:
+                system_source = path
+            print(f"Created autostart file at: {path}")
+            created = True
+        except Exception as e:
+            print(f"Could not create {path}: {e}")
+    return created
+
+def write_screen_blanking_script():
+    """Install the screen blanking prevention script"""
+    # Already root here, so write and chmod in-process rather than via sudo
+    install_file(SCREEN_BLANKING_PATH, SCREEN_BLANKING_SCRIPT.encode("utf-8"), 0o755)
+    print(f"Created screen blanking prevention script at {SCREEN_BLANKING_PATH}")
+
+def write_service_unit():
+    """
+    Install the systemd unit for more reliable startup.
+    
+    Returns True if the file changed, i.e. systemd needs a daemon-reload
+    (which re-parses every unit, so the caller does it once, at the end).
+    """
+    service_bytes = SERVICE_CONTENT.encode("utf-8")
+    try:
+        unchanged = Path(SERVICE_PATH).read_bytes() == service_bytes
+    except OSError:
+        unchanged = False
+    if not unchanged:
+        install_file(SERVICE_PATH, service_bytes, 0o644)
+    print("Created systemd service for Halloween Scare System")
+    return not unchanged
+
 def setup_kiosk_mode():
     """Set up the Raspberry Pi for kiosk mode"""
+    import subprocess
+    from concurrent.futures import ThreadPoolExecutor
+    
     # Check if running as root
     if os.geteuid() != 0:
         print("This script must be run as root (sudo) to set up kiosk mode.")
         print("Please run: sudo python3 kiosk_mode.py --setup")
         return False
     
+    # Nothing to do if this exact configuration was already set up and is still in place
+    fingerprint = setup_fingerprint()
+    if setup_is_current(fingerprint):
+        print("Kiosk mode is already configured; nothing to do.")
+        print("To disable kiosk mode, run: sudo python3 kiosk_mode.py --disable")
+        return True
+    
     try:
-        # Install required packages
+        # Install required packages (update + install in one apt shell)
         print("Installing required packages...")
-        subprocess.run(["apt-get", "update"], check=True)
-        subprocess.run(["apt-get", "install", "-y", "xserver-xorg", "x11-xserver-utils", 
-                       "lightdm", "unclutter", "python3-tk"], check=True)
+        if packages_installed(KIOSK_PACKAGES):
+            print("Required packages are already installed.")
+        else:
+            install = "apt-get -o Dpkg::Use-Pty=0 install -y --no-install-recommends " + " ".join(KIOSK_PACKAGES)
+            try:
+                cache_fresh = time.time() - os.path.getmtime(APT_PKGCACHE) < APT_CACHE_MAX_AGE
+            except OSError:
+                cache_fresh = False
+            if not cache_fresh:
+                install = "apt-get -o Dpkg::Use-Pty=0 update && " + install
+            subprocess.run(["sh", "-c", install], check=True,
+                           env=dict(os.environ, DEBIAN_FRONTEND="noninteractive"))
         
         # Create scripts to disable screen blanking (try multiple locations for compatibility)
         print("Disabling screen blanking...")
         
-        # Common autostart content
-        autostart_content = """@lxpanel --profile LXDE-pi
-@pcmanfm --desktop --profile LXDE-pi
-@xset s off
-@xset -dpms
-@xset s noblank
-@unclutter -idle 0
-"""
-        
-        # Try multiple locations for different Raspberry Pi OS versions
-        autostart_paths = [
-            "/etc/xdg/lxsession/LXDE-pi/autostart",
-            os.path.expanduser("~/.config/lxsession/LXDE-pi/autostart"),
-            "/etc/xdg/lxsession/LXDE/autostart",
-            os.path.expanduser("~/.config/lxsession/LXDE/autostart")
-        ]
+        # The remaining steps write separate files, so run them concurrently;
+        # most of their time is spent waiting on SD card writes
+        steps = {
+            "LXDE autostart files": write_lxde_autostart,
+            "screen blanking script": write_screen_blanking_script,
+            "systemd service": write_service_unit,
+            "autostart file": lambda: create_autostart_file(True),
+        }
+        with ThreadPoolExecutor(max_workers=len(steps)) as pool:
+            futures = {name: pool.submit(step) for name, step in steps.items()}
         
-        success = False
-        for path in autostart_paths:
+        results = {}
+        for name, future in futures.items():
             try:
-                os.makedirs(os.path.dirname(path), exist_ok=True)
-                with open(path, "w") as f:
-                    f.write(autostart_content)
-                print(f"Created autostart file at: {path}")
-                success = True
+                results[name] = future.result()
             except Exception as e:
-                print(f"Could not create {path}: {e}")
+                print(f"Could not create {name}: {e}")
         
-        if not success:
+        if not results.get("LXDE autostart files"):
             print("Warning: Could not create any autostart files for screen blanking prevention.")
-            
-        # Also create a script in /etc/rc.local for additional screen blanking prevention
-        try:
-            with open("/tmp/screen_blanking.sh", "w") as f:
-                f.write("""#!/bin/bash
-xset s off
-xset -dpms
-xset s noblank
-""")
-            subprocess.run(["sudo", "chmod", "+x", "/tmp/screen_blanking.sh"], check=False)
-            subprocess.run(["sudo", "mv", "/tmp/screen_blanking.sh", "/usr/local/bin/screen_blanking.sh"], check=False)
-            print("Created screen blanking prevention script at /usr/local/bin/screen_blanking.sh")
-        except Exception as e:
-            print(f"Could not create screen blanking script: {e}")
-            
-        # Create a systemd service for more reliable startup
-        try:
-            service_content = f"""[Unit]
-Description=Halloween Scare System
-After=multi-user.target
-
-[Service]
-Type=simple
-User=pi
-WorkingDirectory={PROJECT_DIR}
-Environment=DISPLAY=:0
-ExecStart=/usr/bin/python3 {os.path.join(PROJECT_DIR, 'code/main.py')}
-Restart=on-failure
-RestartSec=5
-
-[Install]
-WantedBy=multi-user.target
-"""
-            
-            with open("/tmp/halloween-scare.service", "w") as f:
-                f.write(service_content)
-                
-            subprocess.run(["sudo", "mv", "/tmp/halloween-scare.service", "/etc/systemd/system/"], check=False)
-            subprocess.run(["sudo", "systemctl", "daemon-reload"], check=False)
-            subprocess.run(["sudo", "systemctl", "enable", "halloween-scare.service"], check=False)
-            print("Created and enabled systemd service for Halloween Scare System")
-        except Exception as e:
-            print(f"Could not create systemd service: {e}")
         
-        # Set up autostart
-        create_autostart_file(True)
+        # The stamp is only written if every step succeeded, so a failed setup is retried
+        complete = len(results) == len(steps)
+        
+        # systemctl is the only step that needs an external tool; it runs once
+        # every file is in place
+        if "systemd service" in results:
+            commands = ["systemctl enable halloween-scare.service"]
+            if results["systemd service"]:
+                # The unit changed: one daemon-reload, and reenable drops
+                # symlinks left by an older [Install] section
+                commands = ["systemctl daemon-reload", "systemctl reenable halloween-scare.service"]
+            result = subprocess.run(["sh", "-c", " && ".join(commands)], check=False)
+            if result.returncode == 0:
+                print("Enabled systemd service for Halloween Scare System")
+            else:
+                print(f"Error enabling systemd service (exit code {result.returncode})")
+                complete = False
+        
+        missing = [path for path in INSTALLED_PATHS if not os.path.exists(path)]
+        for path in missing:
+            print(f"Missing after setup: {path}")
+        
+        if not complete or missing:
+            print("\nKiosk mode setup did not complete; fix the errors above and run --setup again.")
+            return False
+        
+        try:
+            write_setup_stamp(fingerprint)
+        except OSError as e:
+            print(f"Could not record setup stamp: {e}")
         
         print("\nKiosk mode setup complete!")
         print("The system will now boot directly into the Halloween Scare GUI.")
@@ -184,27 +399,30 @@ WantedBy=multi-user.target
 
 def check_kiosk_mode_status():
     """Check the current status of kiosk mode components"""
+    import subprocess
+    
     print("\n=== Halloween Scare System Kiosk Mode Status ===")
     
     # Check autostart file
-    autostart_file = os.path.expanduser('~/.config/autostart/halloween_scare.desktop')
-    if os.path.exists(autostart_file):
+    if os.path.exists(AUTOSTART_FILE):
         print("✓ Autostart file: ENABLED")
     else:
         print("✗ Autostart file: NOT FOUND")
     
-    # Check systemd service
+    # Check systemd service (both states from one systemctl call)
     try:
-        result = subprocess.run(["systemctl", "is-enabled", "halloween-scare.service"], 
+        result = subprocess.run(["systemctl", "show", "halloween-scare.service",
+                                 "-p", "UnitFileState", "-p", "ActiveState"],
                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=False)
-        if "enabled" in result.stdout:
+        # Output is "Key=Value" lines; parse by name since the order isn't guaranteed
+        states = dict(line.split("=", 1) for line in result.stdout.splitlines() if "=" in line)
+        
+        if states.get("UnitFileState") == "enabled":
             print("✓ Systemd service: ENABLED")
         else:
             print("✗ Systemd service: DISABLED")
             
-        result = subprocess.run(["systemctl", "is-active", "halloween-scare.service"], 
-                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=False)
-        if "active" in result.stdout:
+        if states.get("ActiveState") == "active":
             print("✓ Systemd service status: RUNNING")
         else:
             print("✗ Systemd service status: NOT RUNNING")
@@ -212,7 +430,7 @@ def check_kiosk_mode_status():
         print("? Systemd service: UNKNOWN (could not check status)")
     
     # Check screen blanking prevention
-    if os.path.exists("/usr/local/bin/screen_blanking.sh"):
+    if os.path.exists(SCREEN_BLANKING_PATH):
         print("✓ Screen blanking prevention: INSTALLED")
     else:
         print("✗ Screen blanking prevention: NOT INSTALLED")
@@ -222,6 +440,8 @@ def check_kiosk_mode_status():
 
 def main():
     """Main function to parse arguments and run the appropriate action"""
+    import argparse
+    
     parser = argparse.ArgumentParser(description="Halloween Scare System Kiosk Mode Setup")
     group = parser.add_mutually_exclusive_group()
     group.add_argument("--setup", action="store_true", help="Set up kiosk mode (requires sudo)")
@@ -3,10 +3,23 @@ Main Program for Button-Activated Halloween Scare with Raspberry Pi 5
 This program integrates button detection, keyboard input, output control, and audio output for Halloween scares.
 """
 from motion_sensor import ButtonTrigger, KeyboardTrigger
-from output_control import OutputDevice
+from output_control import OutputDevice, sleep_until
 from audio_output import AudioOutput
+import os
 import time
 import sys
+import random
+import shutil
+import signal
+import subprocess
+import threading
+import queue
+import contextlib
+import numpy as np
+
+# systemd stops the service with SIGTERM; turn it into a normal exit so the
+# finally-block and atexit cleanup (GPIO, USB relay) still run
+signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
 
 # Import all keyboard input handlers
 keyboard_handlers = []
@@ -38,7 +51,6 @@ OUTPUT_PIN = 18      # LED/Relay pin (BCM numbering)
 KEYBOARD_KEY = 'w'   # Keyboard key to trigger the scare
 
 # Use audio files from the project directory
-import os
 PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 AUDIO_DIR = os.path.join(PROJECT_DIR, "audio_files")  # Audio files in project directory
 
@@ -54,12 +66,26 @@ LAST_ACTIVITY_TIME = time.time()  # Track when the last activity occurred
 LAST_IDLE_SOUND_TIME = 0  # Track when the last idle sound was played
 IDLE_SOUND_PLAYED = False  # Track if idle sound has been played
 LAST_IDLE_SOUND = ""  # Track the last idle sound played to avoid repetition
+# Set on any trigger so the main loop re-plans its idle wait right away
+activity_event = threading.Event()
 
 # Output toggle configuration
 MIN_TOGGLE_DURATION = 0.1  # Minimum duration for output to stay on/off (in seconds)
 MAX_TOGGLE_DURATION = 0.3  # Maximum duration for output to stay on/off (in seconds)
 # No longer using probability - we'll toggle every time for more consistent behavior
 
+def _toggle_schedule(count, duration):
+    """Return the time.monotonic() deadline of the initial ON phase and every toggle
+    
+    The whole schedule is computed in one NumPy call; sleeping until fixed
+    deadlines keeps GPIO and print time from stretching the pattern.
+    
+    Args:
+        count: Number of OFF/ON toggles that follow the initial ON phase
+        duration: Duration in seconds for each toggle state (on or off)
+    """
+    return (time.monotonic() + duration * np.arange(1, 2 * count + 2)).tolist()
+
 # Simple function to toggle output for a fixed number of times
 def _toggle_output_fixed_count(count, duration=0.2):
     """Toggle the output on and off a fixed number of times
@@ -68,26 +94,25 @@ def _toggle_output_fixed_count(count, duration=0.2):
         count: Number of toggles to perform
         duration: Duration in seconds for each toggle state (on or off)
     """
-    import time
-    
     print(f"\n[TOGGLE] Starting output toggling for {count} toggles (duration: {duration:.1f}s)")
     
     # Always start with output on
     output.turn_on()
+    deadlines = _toggle_schedule(count, duration)
     print("\n[TOGGLE] Output ON")
-    time.sleep(duration)
+    sleep_until(deadlines[0])
     
     # Do a fixed number of toggles
     for i in range(count):
         # Toggle off
         output.turn_off()
         print(f"\n[TOGGLE] Toggle {i+1}/{count}: Output OFF")
-        time.sleep(duration)
+        sleep_until(deadlines[2 * i + 1])
         
         # Toggle on
         output.turn_on()
         print(f"\n[TOGGLE] Toggle {i+1}/{count}: Output ON")
-        time.sleep(duration)
+        sleep_until(deadlines[2 * i + 2])
     
     # Always end with output off
     output.turn_off()
@@ -98,10 +123,6 @@ def _toggle_output_fixed_count(count, duration=0.2):
 # Function to do a simple scare sequence with audio
 def do_simple_scare_with_audio(audio_path=None):
     """Perform a simple scare sequence with toggling and audio"""
-    import threading
-    import time
-    import queue
-    
     # Turn on output
     output.turn_on()
     print("\n[SCARE] Output activated for scare")
@@ -113,9 +134,12 @@ def do_simple_scare_with_audio(audio_path=None):
     toggle_count = 10  # Default toggle count
     toggle_duration = 0.2  # Default toggle duration (seconds)
     
+    # Extension of the selected file, lowercased once for all the checks below
+    ext = os.path.splitext(audio_path)[1].lower() if audio_path else None
+    
     if audio_path:
         # Get a more accurate estimate of audio duration
-        if audio_path.lower().endswith('.wav'):
+        if ext == '.wav':
             # For WAV files, use file size for estimation
             file_size = os.path.getsize(audio_path)
             # Rough estimate: 176400 bytes per second for 44.1kHz stereo
@@ -130,13 +154,13 @@ def do_simple_scare_with_audio(audio_path=None):
                 # Calculate toggle count based on duration (2.5 toggles per second)
                 toggle_count = max(5, min(20, int(estimated_duration * 2.5)))
                 print(f"\n[AUDIO] Estimated WAV duration: {estimated_duration:.1f} seconds, using {toggle_count} toggles")
-        elif audio_path.lower().endswith('.mp3'):
+        elif ext == '.mp3':
             # MP3 files are typically longer
             toggle_count = 15  # Use more toggles for MP3 files
             print(f"\n[AUDIO] Using {toggle_count} toggles for MP3 file")
     
     # For WAV files less than 100KB, play the audio first, then do the toggling
-    if audio_path and audio_path.lower().endswith('.wav') and os.path.getsize(audio_path) < 100000:
+    if ext == '.wav' and os.path.getsize(audio_path) < 100000:
         print(f"\n[AUDIO] Playing audio first for short WAV file: {os.path.basename(audio_path)}")
         # Play audio in blocking mode
         audio.play_audio_file(audio_path, blocking=True)
@@ -149,7 +173,6 @@ def do_simple_scare_with_audio(audio_path=None):
         if audio_path:
             # Define a wrapper function that signals when audio is done
             def play_audio_and_signal():
-                import time
                 start_time = time.time()
                 
                 # Play the audio file
@@ -157,7 +180,7 @@ def do_simple_scare_with_audio(audio_path=None):
                 
                 # For MP3 files, ensure a minimum playback time of 1.5 seconds
                 # This is because some MP3 files might finish too quickly due to Pygame issues
-                if audio_path.lower().endswith('.mp3'):
+                if ext == '.mp3':
                     elapsed = time.time() - start_time
                     min_playback_time = 1.5  # Minimum playback time in seconds
                     if elapsed < min_playback_time:
@@ -176,46 +199,39 @@ def do_simple_scare_with_audio(audio_path=None):
             # Give audio a small head start
             time.sleep(0.1)
         
-        # Toggle the output with monitoring for audio completion
-        # Pass is_mp3=True if it's an MP3 file so we can check pygame.mixer.music.get_busy()
-        is_mp3 = audio_path and audio_path.lower().endswith('.mp3')
-        _toggle_output_with_audio_sync(toggle_count, toggle_duration, audio_done_queue, is_mp3)
+        # Toggle the output until the audio thread reports that playback is done
+        _toggle_output_with_audio_sync(toggle_count, toggle_duration, audio_done_queue)
     
     # Turn off output at the end
     output.turn_off()
 
 USE_PULLUP = True    # Set to True if using internal pull-up resistor
+BUTTON_BOUNCE_TIME = 0.2  # Seconds; GPIO drops contact bounce before the callback runs
 
 # Function to toggle output while monitoring audio completion
-def _toggle_output_with_audio_sync(count, duration=0.2, audio_done_queue=None, is_mp3=False):
+def _toggle_output_with_audio_sync(count, duration=0.2, audio_done_queue=None):
     """Toggle the output while monitoring audio completion
     
     Args:
         count: Number of toggles to perform (maximum)
         duration: Duration in seconds for each toggle state (on or off)
-        audio_done_queue: Queue to check for audio completion signal
-        is_mp3: Whether the audio file is an MP3 (to check pygame.mixer.music.get_busy())
+        audio_done_queue: Queue to check for audio completion signal; the audio
+            thread puts True once its blocking playback returns (MP3s play as
+            mixer Sounds, so pygame.mixer.music never reports them busy)
     """
-    import time
-    import pygame
-    
     print(f"\n[TOGGLE] Starting output toggling for up to {count} toggles (duration: {duration:.1f}s)")
     
     # Always start with output on
     output.turn_on()
+    deadlines = _toggle_schedule(count, duration)
     print("\n[TOGGLE] Output ON")
-    time.sleep(duration)
+    sleep_until(deadlines[0])
     
     # Check if audio is already done before we even start toggling
     audio_done = False
     try:
         if audio_done_queue and not audio_done_queue.empty():
             audio_done = audio_done_queue.get_nowait()
-        # For MP3 files, also check pygame.mixer.music.get_busy()
-        elif is_mp3 and 'pygame' in sys.modules and hasattr(pygame.mixer.music, 'get_busy'):
-            if not pygame.mixer.music.get_busy():
-                audio_done = True
-                print("\n[TOGGLE] Audio playback already complete (detected by pygame)")
     except Exception as e:
         print(f"\n[TOGGLE] Error checking audio status: {e}")
     
@@ -229,7 +245,7 @@ def _toggle_output_with_audio_sync(count, duration=0.2, audio_done_queue=None, i
         # Toggle off
         output.turn_off()
         print(f"\n[TOGGLE] Toggle {i+1}/{count}: Output OFF")
-        time.sleep(duration)
+        sleep_until(deadlines[2 * i + 1])
         
         # Check if audio is done
         try:
@@ -239,20 +255,13 @@ def _toggle_output_with_audio_sync(count, duration=0.2, audio_done_queue=None, i
                     print("\n[TOGGLE] Audio playback complete, stopping toggle immediately")
                     # Break immediately - don't complete this cycle
                     break
-            # For MP3 files, also check pygame.mixer.music.get_busy()
-            elif is_mp3 and 'pygame' in sys.modules and hasattr(pygame.mixer.music, 'get_busy'):
-                if not pygame.mixer.music.get_busy():
-                    audio_done = True
-                    print("\n[TOGGLE] Audio playback complete (detected by pygame), stopping toggle immediately")
-                    # Break immediately - don't complete this cycle
-                    break
         except Exception as e:
             print(f"\n[TOGGLE] Error checking audio status: {e}")
         
         # Toggle on
         output.turn_on()
         print(f"\n[TOGGLE] Toggle {i+1}/{count}: Output ON")
-        time.sleep(duration)
+        sleep_until(deadlines[2 * i + 2])
         
         # Check if audio is done again
         try:
@@ -262,13 +271,6 @@ def _toggle_output_with_audio_sync(count, duration=0.2, audio_done_queue=None, i
                     print("\n[TOGGLE] Audio playback complete, stopping toggle immediately")
                     # Break immediately - don't complete this cycle
                     break
-            # For MP3 files, also check pygame.mixer.music.get_busy()
-            elif is_mp3 and 'pygame' in sys.modules and hasattr(pygame.mixer.music, 'get_busy'):
-                if not pygame.mixer.music.get_busy():
-                    audio_done = True
-                    print("\n[TOGGLE] Audio playback complete (detected by pygame), stopping toggle immediately")
-                    # Break immediately - don't complete this cycle
-                    break
         except Exception as e:
             print(f"\n[TOGGLE] Error checking audio status: {e}")
     
@@ -283,50 +285,84 @@ def _toggle_output_with_audio_sync(count, duration=0.2, audio_done_queue=None, i
 
 # Original toggle function kept for short WAV files
 
+# Triggers waiting for the scare worker; one slot, so extra presses are dropped
+scare_queue = queue.Queue(maxsize=1)
+
 # Define the response to button press
 def button_pressed():
-    """Function called when button is pressed to trigger Halloween scare"""
-    global SCARE_IN_PROGRESS, LAST_ACTIVITY_TIME, IDLE_SOUND_PLAYED
+    """Function called when button is pressed to trigger Halloween scare
+    
+    Runs on the GPIO, keyboard or GUI thread that saw the trigger, so it only
+    records the activity and hands the scare to the worker thread.
+    """
+    global LAST_ACTIVITY_TIME, IDLE_SOUND_PLAYED
     
     # Update the last activity time - with error handling
     try:
-        import time as button_time  # Local import to avoid any shadowing issues
-        LAST_ACTIVITY_TIME = button_time.time()
+        LAST_ACTIVITY_TIME = time.time()
     except Exception as e:
         print(f"\n[ERROR] Error updating activity time: {e}")
         # Use a fallback value if time module fails
         LAST_ACTIVITY_TIME = LAST_ACTIVITY_TIME + 1 if 'LAST_ACTIVITY_TIME' in globals() else 0
     
     IDLE_SOUND_PLAYED = False
+    activity_event.set()
     
-    # Check if a scare is already in progress
-    if SCARE_IN_PROGRESS:
-        print("\n[SYSTEM] Scare already in progress. Ignoring trigger.")
-        return
+    # A full queue means a scare is already waiting to start
+    try:
+        scare_queue.put_nowait(True)
+    except queue.Full:
+        pass
+
+@contextlib.contextmanager
+def _button_disabled():
+    """Ignore the button during a scare; switching the output can induce edges on its line"""
+    paused = button.pause_interrupt()
+    try:
+        yield
+    finally:
+        if paused:
+            button.resume_interrupt()
+
+def _scare_worker():
+    """Run queued scares one at a time on a dedicated thread"""
+    while True:
+        scare_queue.get()
+        try:
+            with _button_disabled():
+                _do_scare()
+        except Exception as e:
+            print(f"\n[ERROR] Error during scare: {e}")
+        
+        # Drop triggers that arrived while this scare was running
+        try:
+            while True:
+                scare_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+def _do_scare():
+    """Perform the Halloween scare (called on the scare worker thread)"""
+    global SCARE_IN_PROGRESS, LAST_ACTIVITY_TIME, IDLE_SOUND_PLAYED
     
-    # Set the flag to indicate a scare is in progress
+    # Set the flag to indicate a scare is in progress (checked by the idle timer)
     SCARE_IN_PROGRESS = True
     
     print("\n[SYSTEM] Button pressed! Activating Halloween scare...")
     
     try:
-        # Check if audio files are available
-        audio_files = os.listdir(audio.audio_dir)
+        # Check if audio files are available (cached until the directory changes)
+        valid_audio_files = audio.list_audio_files()
         audio_path = None
         
         # Stop any currently playing audio first
         audio.stop_audio()
         
         # Select an audio file if available
-        if audio_files:
-            # Filter for valid audio files
-            valid_audio_files = [f for f in audio_files if f.lower().endswith(('.wav', '.mp3', '.ogg'))]
-            
-            if valid_audio_files:
-                import random
-                random_file = random.choice(valid_audio_files)
-                audio_path = os.path.join(audio.audio_dir, random_file)
-                print(f"\n[AUDIO] Selected Halloween audio: {random_file}")
+        if valid_audio_files:
+            random_file = random.choice(valid_audio_files)
+            audio_path = os.path.join(audio.audio_dir, random_file)
+            print(f"\n[AUDIO] Selected Halloween audio: {random_file}")
         
         # Do the scare sequence with audio playing simultaneously
         print("\n[SYSTEM] Starting scare sequence with synchronized audio")
@@ -351,16 +387,18 @@ def button_pressed():
         # Reset the flags to allow new scares and update activity time
         SCARE_IN_PROGRESS = False
         try:
-            import time as cleanup_time
-            LAST_ACTIVITY_TIME = cleanup_time.time()  # Reset activity timer after scare completes
+            LAST_ACTIVITY_TIME = time.time()  # Reset activity timer after scare completes
         except Exception as e:
             print(f"\n[ERROR] Error updating activity time during cleanup: {e}")
             # Use a fallback value if time module fails
             LAST_ACTIVITY_TIME = LAST_ACTIVITY_TIME + 1 if 'LAST_ACTIVITY_TIME' in globals() else 0
         IDLE_SOUND_PLAYED = False  # Reset idle sound flag
+        activity_event.set()
         
     print("\n[SYSTEM] Halloween scare complete")
 
+scare_thread = threading.Thread(target=_scare_worker, name="scare-worker", daemon=True)
+scare_thread.start()
 
 # Initialize components
 print("Initializing Halloween scare components...")
@@ -384,41 +422,32 @@ try:
         print(f"1. Output device initialized using USB relay")
         
     # Initialize button trigger
-    from motion_sensor import ButtonTrigger, KeyboardTrigger
-    button = ButtonTrigger(BUTTON_PIN, callback=button_pressed, pull_up=USE_PULLUP)
+    button = ButtonTrigger(BUTTON_PIN, callback=button_pressed, pull_up=USE_PULLUP,
+                           debounce_time=BUTTON_BOUNCE_TIME)
     print(f"2. Button trigger initialized on pin {BUTTON_PIN}")
     
-    # Initialize all available keyboard handlers
-    active_keyboard_handlers = []
-    
-    # 1. Try Pico keyboard input (highest priority)
-    pico_keyboard = None
-    if PICO_KEYBOARD_AVAILABLE:
-        pico_keyboard = PicoKeyboardInput(KEYBOARD_KEY, callback=button_pressed)
-        keyboard_handlers.append(("Pico Keyboard", pico_keyboard))
-        print(f"3a. Pico keyboard input initialized for key '{KEYBOARD_KEY}'")
-    
-    # 2. Try direct keyboard input (for physical keyboard)
-    direct_keyboard = None
-    if DIRECT_KEYBOARD_AVAILABLE:
-        direct_keyboard = DirectKeyboardInput(KEYBOARD_KEY, callback=button_pressed)
-        keyboard_handlers.append(("Direct Keyboard", direct_keyboard))
-        print(f"3b. Direct keyboard input initialized for key '{KEYBOARD_KEY}'")
-    
-    # 3. Try advanced keyboard trigger (for SSH terminal)
-    advanced_keyboard = KeyboardTrigger(KEYBOARD_KEY, callback=button_pressed)
-    keyboard_handlers.append(("Advanced Keyboard", advanced_keyboard))
-    print(f"3c. Advanced keyboard trigger initialized for key '{KEYBOARD_KEY}'")
-    
-    # 4. Try simple keyboard input (fallback)
-    simple_keyboard = None
-    if SIMPLE_KEYBOARD_AVAILABLE:
-        simple_keyboard = SimpleKeyboardInput(KEYBOARD_KEY, callback=button_pressed)
-        keyboard_handlers.append(("Simple Keyboard", simple_keyboard))
-        print(f"3d. Simple keyboard input initialized as fallback")
+    # Initialize all available keyboard handlers, in priority order:
+    # (name, available, factory, name of the handler this one is a fallback for)
+    KEYBOARD_HANDLER_SPECS = [
+        ("Pico Keyboard", PICO_KEYBOARD_AVAILABLE,
+         lambda: PicoKeyboardInput(KEYBOARD_KEY, callback=button_pressed), None),
+        ("Direct Keyboard", DIRECT_KEYBOARD_AVAILABLE,
+         lambda: DirectKeyboardInput(KEYBOARD_KEY, callback=button_pressed), None),
+        ("Advanced Keyboard", True,  # SSH terminal
+         lambda: KeyboardTrigger(KEYBOARD_KEY, callback=button_pressed), None),
+        ("Simple Keyboard", SIMPLE_KEYBOARD_AVAILABLE,
+         lambda: SimpleKeyboardInput(KEYBOARD_KEY, callback=button_pressed), "Advanced Keyboard"),
+    ]
+    
+    msgs = []
+    for name, available, factory, fallback_for in KEYBOARD_HANDLER_SPECS:
+        if available:
+            keyboard_handlers.append((name, factory(), fallback_for))
+            msgs.append(f"3. {name} input initialized for key '{KEYBOARD_KEY}'"
+                        + (f" (fallback for {fallback_for})" if fallback_for else ""))
+    print("\n".join(msgs))
     
     # Initialize audio output
-    from audio_output import AudioOutput
     audio = AudioOutput(AUDIO_DIR)
     print(f"4. Audio output initialized with directory: {AUDIO_DIR}")
     
@@ -439,7 +468,7 @@ IDLE_SOUND_PLAYED = False
 # Test components on startup
 print("\nTesting components:")
 print("1. Testing output device...")
-output.blink(2, 0.2, 0.2)
+output.blink(2, 0.2, 0.2).result()
 
 print("2. Testing audio output...")
 audio.play_tone(440, 0.5)  # Play A4 note
@@ -460,11 +489,10 @@ if audio_files:
     test_audio = True
     
     if test_audio:
-        import random
-        import os
         # Choose a random audio file
         test_file = random.choice(audio_files)
         test_path = os.path.join(audio.audio_dir, test_file)
+        test_ext = os.path.splitext(test_file)[1].lower()
         print(f"\nTesting synchronized output with audio: {test_file}")
         
         # Turn on the output device
@@ -476,13 +504,13 @@ if audio_files:
             print("Playing short audio clip for testing...")
             
             # For WAV files, we'll use a simpler approach
-            if test_file.lower().endswith('.wav'):
-                import subprocess
+            if test_ext == '.wav':
                 try:
                     # Use sox to play just the first 3 seconds if available
                     try:
-                        # Check if sox is installed
-                        subprocess.run(["which", "sox"], check=True, capture_output=True)
+                        # Check if sox is installed (path lookup in-process, no 'which' fork)
+                        if not shutil.which("sox"):
+                            raise FileNotFoundError("sox not found")
                         # Use sox to trim the audio
                         print("Using sox to play trimmed WAV file...")
                         subprocess.run(["play", "-q", test_path, "trim", "0", "3"], check=False)
@@ -491,7 +519,6 @@ if audio_files:
                         print("Sox not available, using aplay...")
                         # Just play the file and manually stop after 3 seconds
                         proc = subprocess.Popen(["aplay", "-q", test_path])
-                        import time
                         time.sleep(3)  # Play for 3 seconds
                         proc.terminate()  # Then stop
                         time.sleep(0.1)  # Give it time to clean up
@@ -501,8 +528,7 @@ if audio_files:
                 except Exception as e:
                     print(f"Error during WAV audio test: {e}")
             # For MP3 files
-            elif test_file.lower().endswith('.mp3'):
-                import subprocess
+            elif test_ext == '.mp3':
                 print("Playing short MP3 clip for testing...")
                 try:
                     # Play for 3 seconds
@@ -516,7 +542,6 @@ if audio_files:
                 try:
                     # Just play and stop after 3 seconds
                     audio.play_audio_file(test_path)
-                    import time
                     time.sleep(3)
                     audio.stop_audio()
                     print("Audio test complete")
@@ -544,42 +569,31 @@ if not interrupt_success:
 # Setup all keyboard handlers
 print("\nSetting up keyboard handlers...")
 active_keyboard_handlers = []
+msgs = []
 
-# Start Pico keyboard input (highest priority)
-if pico_keyboard:
-    print("Starting Pico keyboard input...")
-    pico_keyboard.start()
-    active_keyboard_handlers.append(("Pico Keyboard", pico_keyboard))
-    print(f"Pico keyboard input started for key '{KEYBOARD_KEY}'")
-
-# Start direct keyboard input (for physical keyboard)
-if direct_keyboard:
-    print("Starting direct keyboard input for physical keyboard...")
-    direct_keyboard.start()
-    active_keyboard_handlers.append(("Direct Keyboard", direct_keyboard))
-    print(f"Direct keyboard input started for key '{KEYBOARD_KEY}'")
-
-# Start advanced keyboard trigger (for SSH terminal)
-print("Starting advanced keyboard trigger for SSH terminal...")
-keyboard_success = advanced_keyboard.start_monitoring()
-if keyboard_success:
-    active_keyboard_handlers.append(("Advanced Keyboard", advanced_keyboard))
-    print(f"Advanced keyboard monitoring started for key '{KEYBOARD_KEY}'")
-
-# If advanced keyboard monitoring fails, try the simple method
-if not keyboard_success and simple_keyboard is not None:
-    print("Advanced keyboard monitoring failed. Falling back to simple keyboard input...")
-    simple_keyboard.start()
-    active_keyboard_handlers.append(("Simple Keyboard", simple_keyboard))
-    print(f"Simple keyboard input started for key '{KEYBOARD_KEY}'")
+for name, handler, fallback_for in keyboard_handlers:
+    # Fallback handlers only start if the handler they back up did not
+    if fallback_for and any(active == fallback_for for active, _ in active_keyboard_handlers):
+        continue
+    
+    # KeyboardTrigger uses start_monitoring(), the other handlers start();
+    # both return True once the handler is running
+    start = getattr(handler, 'start_monitoring', None) or handler.start
+    if not start():
+        msgs.append(f"{name} failed to start")
+        continue
+    
+    active_keyboard_handlers.append((name, handler))
+    msgs.append(f"{name} input started for key '{KEYBOARD_KEY}'"
+                + (f" ({fallback_for} failed)" if fallback_for else ""))
 
 if not active_keyboard_handlers:
-    print("Warning: No keyboard input methods were successfully started.")
-    print("The system will only respond to button presses.")
+    msgs.append("Warning: No keyboard input methods were successfully started.")
+    msgs.append("The system will only respond to button presses.")
 else:
-    print(f"Successfully started {len(active_keyboard_handlers)} keyboard input methods:")
-    for name, _ in active_keyboard_handlers:
-        print(f"- {name}")
+    msgs.append(f"Successfully started {len(active_keyboard_handlers)} keyboard input methods:")
+    msgs.extend(f"- {name}" for name, _ in active_keyboard_handlers)
+print("\n".join(msgs))
 
 
 # Initialize GUI if enabled
@@ -591,8 +605,6 @@ if USE_GUI:
         print("\nInitializing GUI interface...")
         import gui_callback
         import gui_interface
-        import threading
-        import os
         
         # Check if we're running in a desktop environment
         if 'DISPLAY' not in os.environ and os.path.exists('/dev/fb0'):
@@ -607,7 +619,7 @@ if USE_GUI:
         if gui_interface.is_display_available():
             # Start the GUI in a separate thread
             def start_gui():
-                success = gui_interface.run_gui(gui_callback.button_callback)
+                success = gui_interface.run_gui(gui_callback.fire)
                 if not success:
                     print("Failed to start GUI. Continuing with physical button only.")
                     
@@ -632,9 +644,8 @@ def play_idle_sound():
     # Create idle sounds directory if it doesn't exist
     os.makedirs(IDLE_SOUNDS_DIR, exist_ok=True)
     
-    # Get list of idle sound files
-    idle_files = [f for f in os.listdir(IDLE_SOUNDS_DIR) 
-                 if f.lower().endswith(('.wav', '.mp3', '.ogg'))]
+    # Get list of idle sound files (cached until the directory changes)
+    idle_files = audio.list_audio_files(IDLE_SOUNDS_DIR)
     
     # If no idle sounds in the dedicated directory, try using a sound from the main audio directory
     if not idle_files:
@@ -647,8 +658,7 @@ def play_idle_sound():
                 IDLE_SOUND_PLAYED = True
                 LAST_IDLE_SOUND = default_sound
                 try:
-                    import time as idle_time
-                    LAST_IDLE_SOUND_TIME = idle_time.time()  # Record when the idle sound was played
+                    LAST_IDLE_SOUND_TIME = time.time()  # Record when the idle sound was played
                 except Exception as e:
                     print(f"Error updating idle sound time: {e}")
                     LAST_IDLE_SOUND_TIME = LAST_ACTIVITY_TIME  # Use activity time as fallback
@@ -659,7 +669,6 @@ def play_idle_sound():
     else:
         if not IDLE_SOUND_PLAYED:
             # Select a random idle sound, avoiding the last one played if possible
-            import random
             available_files = [f for f in idle_files if os.path.join(IDLE_SOUNDS_DIR, f) != LAST_IDLE_SOUND]
             
             # If all files have been played or only one file exists, use all files
@@ -674,8 +683,7 @@ def play_idle_sound():
             IDLE_SOUND_PLAYED = True
             LAST_IDLE_SOUND = idle_sound_path
             try:
-                import time as idle_time
-                LAST_IDLE_SOUND_TIME = idle_time.time()  # Record when the idle sound was played
+                LAST_IDLE_SOUND_TIME = time.time()  # Record when the idle sound was played
             except Exception as e:
                 print(f"Error updating idle sound time: {e}")
                 LAST_IDLE_SOUND_TIME = LAST_ACTIVITY_TIME  # Use activity time as fallback
@@ -687,13 +695,11 @@ def check_inactivity():
     global LAST_ACTIVITY_TIME, IDLE_SOUND_PLAYED, LAST_IDLE_SOUND_TIME
     
     try:
-        import time as check_time
-        current_time = check_time.time()
+        current_time = time.time()
         inactive_time = current_time - LAST_ACTIVITY_TIME
     except Exception as e:
         print(f"Error checking inactivity time: {e}")
         # Use a fallback approach that will trigger idle sounds occasionally
-        import random
         current_time = LAST_ACTIVITY_TIME + random.randint(STANDBY_TIMEOUT - 10, STANDBY_TIMEOUT + 10)
         inactive_time = current_time - LAST_ACTIVITY_TIME
     
@@ -706,6 +712,20 @@ def check_inactivity():
     if inactive_time >= STANDBY_TIMEOUT and not SCARE_IN_PROGRESS and not IDLE_SOUND_PLAYED:
         play_idle_sound()
 
+def seconds_until_idle_check():
+    """Return how long the main loop can sleep before check_inactivity() has work to do"""
+    current_time = time.time()
+    if IDLE_SOUND_PLAYED:
+        # Next event: the repeat interval expires and another idle sound may play
+        remaining = LAST_IDLE_SOUND_TIME + IDLE_REPEAT_INTERVAL - current_time
+    else:
+        # Next event: the standby timeout is reached
+        remaining = LAST_ACTIVITY_TIME + STANDBY_TIMEOUT - current_time
+    
+    # Never spin: if a check is already due but blocked (e.g. a scare is running),
+    # the trigger's activity_event will wake the loop when it finishes
+    return max(remaining, 1.0)
+
 # Main loop
 print("\nHalloween scare system ready!")
 print(f"Press the button or the '{KEYBOARD_KEY}' key to trigger...")
@@ -725,8 +745,9 @@ try:
         # Check for inactivity
         check_inactivity()
         
-        # Sleep for a short time to avoid high CPU usage
-        time.sleep(1)
+        # Sleep until the next idle deadline, or until a trigger changes it
+        activity_event.wait(timeout=seconds_until_idle_check())
+        activity_event.clear()
         
 except KeyboardInterrupt:
     print("\nProgram terminated by user")
@@ -8,10 +8,18 @@ This version supports all types of keyboard input:
 """
 from motion_sensor import ButtonTrigger
 from output_control import OutputDevice
-from audio_output import AudioOutput
+from audio_output import AudioOutput, AUDIO_EXTENSIONS, get_audio_duration, preload_audio_durations
 import time
 import sys
+import random
 import os
+import signal
+import threading
+import queue
+
+# systemd stops the service with SIGTERM; turn it into a normal exit so the
+# finally-block and atexit cleanup (GPIO, USB relay) still run
+signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
 
 # Import all keyboard input handlers
 keyboard_handlers = []
@@ -69,12 +77,8 @@ def button_pressed():
         audio_files = audio.list_audio_files()
         if audio_files:
             # Play a random audio file if available
-            import random
-            import os
-            import time
-            
             # Filter for common audio formats
-            valid_audio_files = [f for f in audio_files if f.lower().endswith(('.wav', '.mp3', '.ogg'))]
+            valid_audio_files = [f for f in audio_files if os.path.splitext(f)[1].lower() in AUDIO_EXTENSIONS]
             
             if valid_audio_files:
                 random_file = random.choice(valid_audio_files)
@@ -88,25 +92,19 @@ def button_pressed():
                 success = audio.play_audio_file(audio_path)
                 
                 if success:
+                    ext = os.path.splitext(random_file)[1].lower()
                     # For WAV files, we'll use a blocking approach
-                    if random_file.lower().endswith('.wav'):
+                    if ext == '.wav':
                         # For WAV files, play_audio_file is already blocking, so we don't need to wait
                         # The function will return when playback is complete
                         print("WAV playback complete, continuing...")
                     # For MP3 files, we can estimate duration
-                    elif random_file.lower().endswith('.mp3'):
+                    elif ext == '.mp3':
                         try:
-                            # Try to get duration info using a subprocess
-                            import subprocess
-                            result = subprocess.run(["mpg123", "--skip", "0", "--test", audio_path], 
-                                                  capture_output=True, text=True, check=False)
-                            
-                            # Look for duration in output
-                            import re
-                            duration_match = re.search(r'(\d+):(\d+)\.(\d+)', result.stderr)
-                            if duration_match:
-                                mins, secs, _ = duration_match.groups()
-                                duration = int(mins) * 60 + int(secs)
+                            # Read the duration from the file headers (cached per file)
+                            duration = get_audio_duration(audio_path)
+                            if duration:
+                                duration = int(duration)
                                 print(f"Audio duration: approximately {duration} seconds")
                                 
                                 # Wait for audio to finish (with a safety margin)
@@ -151,6 +149,28 @@ def button_pressed():
     print("Halloween scare complete")
 
 
+# Scares waiting for the scare worker; one slot, so extra presses are dropped
+scare_queue = queue.Queue(maxsize=1)
+
+def queue_scare():
+    """Hand a scare to the worker thread, for inputs whose callbacks must return at once"""
+    try:
+        scare_queue.put_nowait(True)
+    except queue.Full:
+        pass
+
+def _scare_worker():
+    """Run queued scares one at a time, off the shared event hub thread"""
+    while True:
+        scare_queue.get()
+        try:
+            button_pressed()
+        except Exception as e:
+            print(f"Error during scare: {e}")
+
+scare_thread = threading.Thread(target=_scare_worker, name="scare-worker", daemon=True)
+scare_thread.start()
+
 # Initialize components
 print("Initializing Halloween scare components...")
 try:
@@ -189,7 +209,8 @@ try:
     # 2. Try direct keyboard input (for physical keyboard)
     direct_keyboard = None
     if DIRECT_KEYBOARD_AVAILABLE:
-        direct_keyboard = DirectKeyboardInput(KEYBOARD_KEY, callback=button_pressed)
+        # Read on the shared event hub thread, so the scare is handed to the worker
+        direct_keyboard = DirectKeyboardInput(KEYBOARD_KEY, callback=queue_scare)
         keyboard_handlers.append(("Direct Keyboard", direct_keyboard))
         print(f"3b. Direct keyboard input initialized for key '{KEYBOARD_KEY}'")
     
@@ -209,7 +230,9 @@ try:
     
     # Initialize audio output
     from audio_output import AudioOutput
-    audio = AudioOutput(AUDIO_DIR)
+    audio = AudioOutput(AUDIO_DIR, check=True)
+    # Look up every file's duration in the background, before the first trigger
+    preload_audio_durations(AUDIO_DIR)
     print(f"4. Audio output initialized with directory: {AUDIO_DIR}")
     
     print("All Halloween scare components initialized successfully")
@@ -220,7 +243,7 @@ except Exception as e:
 # Test components on startup
 print("\nTesting components:")
 print("1. Testing output device...")
-output.blink(2, 0.2, 0.2)
+output.blink(2, 0.2, 0.2).result()
 
 print("2. Testing audio output...")
 audio.play_tone(440, 0.5)  # Play A4 note
@@ -297,7 +320,7 @@ if USE_GUI:
         if gui_interface.is_display_available():
             # Start the GUI in a separate thread
             def start_gui():
-                success = gui_interface.run_gui(gui_callback.button_callback)
+                success = gui_interface.run_gui(gui_callback.fire)
                 if not success:
                     print("Failed to start GUI. Continuing with physical button only.")
                     
@@ -11,7 +11,7 @@ import tty
 import select
 
 class ButtonTrigger:
-    def __init__(self, pin_number=17, callback=None, pull_up=True):
+    def __init__(self, pin_number=17, callback=None, pull_up=True, debounce_time=0.3):
         """
         Initialize the button trigger.
         
@@ -19,6 +19,8 @@ class ButtonTrigger:
             pin_number: GPIO pin number connected to the button (BCM numbering)
             callback: Function to call when button is pressed
             pull_up: Whether to use internal pull-up resistor (True) or external pull-down (False)
+            debounce_time: Seconds to ignore further edges after a press; in interrupt
+                mode this is passed to GPIO as bouncetime, so bounces never reach Python
         """
         # Use BCM pin numbering
         GPIO.setmode(GPIO.BCM)
@@ -26,8 +28,10 @@ class ButtonTrigger:
         self.pin_number = pin_number
         self.callback = callback
         self.last_press_time = 0
-        self.debounce_time = 0.3  # 300ms debounce to avoid button bounce
+        self.debounce_time = debounce_time  # Debounce to avoid button bounce
         self.pull_up = pull_up
+        self.interrupt_active = False  # True while GPIO edge detection is registered
+        self._interrupt_handler = None
         
         # Set up the GPIO pin as input with pull-up or pull-down
         if pull_up:
@@ -98,13 +102,8 @@ class ButtonTrigger:
             except:
                 pass  # It's okay if there was no event detection to remove
             
-            # Set up event detection based on pull-up/down configuration
-            if self.pull_up:
-                # When using pull-up, detect falling edge (button press pulls to ground)
-                GPIO.add_event_detect(self.pin_number, GPIO.FALLING, callback=handle_interrupt, bouncetime=int(self.debounce_time * 1000))
-            else:
-                # When using pull-down, detect rising edge (button press pulls to 3.3V)
-                GPIO.add_event_detect(self.pin_number, GPIO.RISING, callback=handle_interrupt, bouncetime=int(self.debounce_time * 1000))
+            self._interrupt_handler = handle_interrupt
+            self._add_event_detect()
                 
             print(f"Button interrupt set up on pin {self.pin_number}")
             return True
@@ -120,6 +119,40 @@ class ButtonTrigger:
             self.polling_thread.start()
             return False
     
+    def _add_event_detect(self):
+        """Register edge detection for the button with the stored interrupt handler"""
+        # Set up event detection based on pull-up/down configuration
+        if self.pull_up:
+            # When using pull-up, detect falling edge (button press pulls to ground)
+            GPIO.add_event_detect(self.pin_number, GPIO.FALLING, callback=self._interrupt_handler, bouncetime=int(self.debounce_time * 1000))
+        else:
+            # When using pull-down, detect rising edge (button press pulls to 3.3V)
+            GPIO.add_event_detect(self.pin_number, GPIO.RISING, callback=self._interrupt_handler, bouncetime=int(self.debounce_time * 1000))
+        self.interrupt_active = True
+    
+    def pause_interrupt(self):
+        """
+        Temporarily stop edge detection, e.g. while an output that couples into
+        the button line is switching. Returns True if detection was paused.
+        """
+        if not self.interrupt_active:
+            return False
+        try:
+            GPIO.remove_event_detect(self.pin_number)
+        except Exception:
+            pass
+        self.interrupt_active = False
+        return True
+    
+    def resume_interrupt(self):
+        """Re-enable edge detection after pause_interrupt()"""
+        if self.interrupt_active or self._interrupt_handler is None:
+            return
+        try:
+            self._add_event_detect()
+        except RuntimeError as e:
+            print(f"Warning: Could not re-enable button interrupt: {e}")
+    
     def _polling_loop(self):
         """
         Internal polling loop used as fallback if interrupts fail.
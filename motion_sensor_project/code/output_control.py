@@ -4,6 +4,25 @@ This module handles controlling output devices like LEDs or relays.
 """
 import RPi.GPIO as GPIO
 import time
+import glob
+
+# Try to import libgpiod v2 (character-device GPIO, one ioctl per state change)
+try:
+    import gpiod
+    from gpiod.line import Direction, Value
+    GPIOD_AVAILABLE = True
+except ImportError:
+    GPIOD_AVAILABLE = False
+
+# Labels of the GPIO chips driving the 40-pin header (Pi 5, Pi 4, older Pis)
+HEADER_CHIP_LABELS = ("pinctrl-rp1", "pinctrl-bcm2711", "pinctrl-bcm2835")
+
+def sleep_until(deadline):
+    """Sleep until a time.monotonic() deadline; returns at once if it has passed"""
+    remaining = deadline - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
+
 
 class OutputDevice:
     def __init__(self, pin_number=18, active_high=True):
@@ -57,11 +76,16 @@ class OutputDevice:
         """
         original_state = self.is_on
         
+        # Sleep to absolute deadlines so GPIO/print overhead and sleep
+        # overshoot don't accumulate over the sequence
+        deadline = time.monotonic()
         for _ in range(times):
             self.turn_on()
-            time.sleep(on_time)
+            deadline += on_time
+            sleep_until(deadline)
             self.turn_off()
-            time.sleep(off_time)
+            deadline += off_time
+            sleep_until(deadline)
         
         # Restore original state if it was on
         if original_state:
@@ -85,6 +109,125 @@ class OutputDevice:
         print(f"Output device resources on pin {self.pin_number} cleaned up")
 
 
+def find_header_gpio_chip():
+    """
+    Find the GPIO chip that drives the 40-pin header.
+    
+    On a Pi 5 this is gpiochip4 on older kernels and gpiochip0 on newer ones.
+    Returns the chip's device path, defaulting to /dev/gpiochip0.
+    """
+    for path in sorted(glob.glob("/dev/gpiochip*")):
+        try:
+            with gpiod.Chip(path) as chip:
+                if chip.get_info().label in HEADER_CHIP_LABELS:
+                    return path
+        except OSError:
+            continue
+    return "/dev/gpiochip0"
+
+
+class GpiodOutputDevice:
+    """
+    Output device driven through libgpiod v2 line requests.
+    
+    Same interface as OutputDevice. Each state change is a single
+    set_values() ioctl, and the line stays requested until cleanup().
+    """
+    
+    def __init__(self, pin_number=18, active_high=True, chip_path=None):
+        """
+        Initialize the output device.
+        
+        Args:
+            pin_number: GPIO line offset connected to the output device (BCM numbering)
+            active_high: True if the device is active when the pin is high,
+                         False if active when the pin is low
+            chip_path: GPIO chip device; if None, the header's chip is looked up
+        """
+        if not GPIOD_AVAILABLE:
+            raise RuntimeError("gpiod module not available")
+        
+        self.pin_number = pin_number
+        self.active_high = active_high
+        self.is_on = False
+        
+        # active_low lets the kernel handle polarity, so ACTIVE always means on
+        self._request = gpiod.request_lines(
+            chip_path or find_header_gpio_chip(),
+            consumer="halloween-scare",
+            config={pin_number: gpiod.LineSettings(direction=Direction.OUTPUT,
+                                                   active_low=not active_high,
+                                                   output_value=Value.INACTIVE)})
+        
+        # Line values for each state, built once
+        self._on_values = {pin_number: Value.ACTIVE}
+        self._off_values = {pin_number: Value.INACTIVE}
+        
+        print(f"Output device on pin {self.pin_number} requested through gpiod")
+    
+    def turn_on(self):
+        """Turn on the output device."""
+        self._request.set_values(self._on_values)
+        self.is_on = True
+        print(f"Output device on pin {self.pin_number} turned ON")
+    
+    def turn_off(self):
+        """Turn off the output device."""
+        self._request.set_values(self._off_values)
+        self.is_on = False
+        print(f"Output device on pin {self.pin_number} turned OFF")
+    
+    def toggle(self):
+        """Toggle the output device state."""
+        if self.is_on:
+            self.turn_off()
+        else:
+            self.turn_on()
+    
+    def blink(self, times=3, on_time=0.2, off_time=0.2):
+        """
+        Blink the output device.
+        
+        Args:
+            times: Number of blinks
+            on_time: Time in seconds to stay on
+            off_time: Time in seconds to stay off
+        """
+        original_state = self.is_on
+        set_values = self._request.set_values
+        
+        # Sleep to absolute deadlines, as in OutputDevice.blink()
+        deadline = time.monotonic()
+        for _ in range(times):
+            set_values(self._on_values)
+            deadline += on_time
+            sleep_until(deadline)
+            set_values(self._off_values)
+            deadline += off_time
+            sleep_until(deadline)
+        self.is_on = False
+        
+        # Restore original state if it was on
+        if original_state:
+            self.turn_on()
+    
+    def pulse(self, duration=1.0):
+        """
+        Turn on the output device for a specified duration.
+        
+        Args:
+            duration: Time in seconds to keep the device on
+        """
+        self.turn_on()
+        time.sleep(duration)
+        self.turn_off()
+    
+    def cleanup(self):
+        """Release the GPIO line"""
+        self._request.release()
+        print(f"Output device resources on pin {self.pin_number} cleaned up")
+
+
 # Example usage
 if __name__ == "__main__":
     try:
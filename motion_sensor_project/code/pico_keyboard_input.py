@@ -7,10 +7,22 @@ programmed to act as a keyboard device.
 import threading
 import time
 import os
-import struct
 import select
-import sys
 import glob
+import numpy as np
+
+from direct_keyboard_input import key_code_for, INPUT_EVENT_SIZE
+
+# Linux input_event as a NumPy record (same native layout as struct "llHHI"),
+# so a whole read() buffer is parsed and filtered in one vectorized pass
+INPUT_EVENT_DTYPE = np.dtype([('sec', 'l'), ('usec', 'l'), ('type', 'H'), ('code', 'H'), ('value', 'I')], align=True)
+if INPUT_EVENT_DTYPE.itemsize != INPUT_EVENT_SIZE:
+    # ImportError, so callers that treat this module as optional just skip it
+    raise ImportError(f"input_event layout mismatch: NumPy record is {INPUT_EVENT_DTYPE.itemsize} bytes, "
+                      f"kernel events are {INPUT_EVENT_SIZE}")
+
+# Bytes read per ready device: as many whole events as fit in 4 KiB
+EVENT_READ_SIZE = (4096 // INPUT_EVENT_SIZE) * INPUT_EVENT_SIZE
 
 class PicoKeyboardInput:
     def __init__(self, key='w', callback=None):
@@ -27,28 +39,15 @@ class PicoKeyboardInput:
         self.thread = None
         self.last_press_time = 0
         self.debounce_time = 0.3  # 300ms debounce
-        self.key_mapping = self._create_key_mapping()
-        self.key_code = self.key_mapping.get(self.key)
+        self.key_code = key_code_for(self.key)
+        
+        # Key codes that trigger the callback
+        self._codes_of_interest = np.array([] if self.key_code is None else [self.key_code], dtype=np.uint16)
         self.device_paths = []
         
         if self.key_code is None:
             print(f"Warning: No key code mapping found for '{self.key}'. Key detection may not work.")
     
-    def _create_key_mapping(self):
-        """Create a mapping of characters to Linux input event codes"""
-        # This is a basic mapping of common keys to their event codes
-        # These codes are standard for most keyboards on Linux
-        return {
-            'a': 30, 'b': 48, 'c': 46, 'd': 32, 'e': 18, 'f': 33, 'g': 34, 'h': 35, 'i': 23,
-            'j': 36, 'k': 37, 'l': 38, 'm': 50, 'n': 49, 'o': 24, 'p': 25, 'q': 16, 'r': 19,
-            's': 31, 't': 20, 'u': 22, 'v': 47, 'w': 17, 'x': 45, 'y': 21, 'z': 44,
-            '0': 11, '1': 2, '2': 3, '3': 4, '4': 5, '5': 6, '6': 7, '7': 8, '8': 9, '9': 10,
-            'space': 57, 'return': 28, 'enter': 28, 'esc': 1, 'escape': 1,
-            'backspace': 14, 'tab': 15, 'caps': 58, 'capslock': 58,
-            'f1': 59, 'f2': 60, 'f3': 61, 'f4': 62, 'f5': 63,
-            'f6': 64, 'f7': 65, 'f8': 66, 'f9': 67, 'f10': 68
-        }
-    
     def _find_input_devices(self):
         """Find all possible input devices"""
         # This will find ALL input devices, not just keyboards
@@ -117,47 +116,43 @@ class PicoKeyboardInput:
         print(f"Monitoring {len(open_devices)} devices for '{self.key}' key presses...")
         print(f"Key code to detect: {self.key_code}")
         
-        # Event format: long int, long int, unsigned short, unsigned short, unsigned int
-        event_size = struct.calcsize("llHHI")
-        event_format = "llHHI"
+        # Map each device to its path once instead of searching per event
+        device_paths = {device: device_path for device_path, device in open_devices}
         
         try:
             while self.running:
                 # Create a list of file descriptors to monitor
-                read_list = [device for _, device in open_devices]
+                read_list = list(device_paths)
                 
                 # Use select to wait for input on any device
                 r, _, _ = select.select(read_list, [], [], 0.1)
                 
                 for device in r:
-                    # Find which device this is
-                    device_info = next((info for info in open_devices if info[1] == device), None)
-                    if device_info:
-                        device_path, _ = device_info
-                    else:
-                        device_path = "Unknown device"
+                    device_path = device_paths.get(device, "Unknown device")
                     
                     try:
-                        event = device.read(event_size)
-                        if event:
-                            # Parse the event
-                            (tv_sec, tv_usec, ev_type, code, value) = struct.unpack(event_format, event)
+                        # Read every queued event at once (always whole events)
+                        data = os.read(device.fileno(), EVENT_READ_SIZE)
+                        if data:
+                            events = np.frombuffer(data, dtype=INPUT_EVENT_DTYPE)
                             
                             # EV_KEY event type is 1, value=1 means key press (0=release, 2=repeat)
-                            if ev_type == 1 and value == 1:  # Key press event
-                                print(f"Key pressed on {device_path}: code={code}, value={value}")
-                                
-                                # Check if it's our target key
-                                if code == self.key_code:
-                                    current_time = time.time()
-                                    if current_time - self.last_press_time > self.debounce_time:
-                                        print(f"Key '{self.key}' pressed! Triggering action...")
-                                        self.last_press_time = current_time
-                                        if self.callback:
-                                            try:
-                                                self.callback()
-                                            except Exception as e:
-                                                print(f"Error in key callback: {e}")
+                            presses = events['code'][(events['type'] == 1) & (events['value'] == 1)]
+                            if presses.size == 0:
+                                continue
+                            print(f"Key pressed on {device_path}: codes={presses.tolist()}")
+                            
+                            # Check if any of them is our target key
+                            if np.isin(presses, self._codes_of_interest).any():
+                                current_time = time.time()
+                                if current_time - self.last_press_time > self.debounce_time:
+                                    print(f"Key '{self.key}' pressed! Triggering action...")
+                                    self.last_press_time = current_time
+                                    if self.callback:
+                                        try:
+                                            self.callback()
+                                        except Exception as e:
+                                            print(f"Error in key callback: {e}")
                     except Exception as e:
                         print(f"Error reading from {device_path}: {e}")
         except Exception as e:
@@ -265,10 +260,12 @@ class PicoKeyboardInput:
             method: The method to use for keyboard monitoring.
                    "all" monitors all input devices.
                    "raw" monitors raw HID devices.
+        
+        Returns True once the monitoring thread is running.
         """
         if self.thread is not None and self.thread.is_alive():
             print("Keyboard monitoring is already running.")
-            return
+            return True
         
         self.running = True
         
@@ -286,7 +283,7 @@ class PicoKeyboardInput:
         print("\nPico keyboard input monitoring is now active!")
         print(f"Press '{self.key}' on any connected keyboard or trigger the Pico to send '{self.key}'")
         
-        return self.thread
+        return True
     
     def stop(self):
         """
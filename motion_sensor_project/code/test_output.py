@@ -45,11 +45,11 @@ def test_output(output_type=None, pin=18, usb_port=None):
         time.sleep(1)
         
         print("\n3. Pulse (2 seconds)")
-        output.pulse(2.0)
+        output.pulse(2.0).result()
         time.sleep(1)
         
         print("\n4. Blink (3 times)")
-        output.blink(3, 0.5, 0.5)
+        output.blink(3, 0.5, 0.5).result()
         
         print("\nTests completed successfully!")
         output.cleanup()
@@ -171,12 +171,17 @@ class USBRelay:
             on_time: Time in seconds to keep the relay on during each blink
             off_time: Time in seconds to keep the relay off between blinks
         """
+        # Sleep to absolute deadlines so serial write time and sleep
+        # overshoot don't accumulate over the sequence
+        deadline = time.monotonic()
         for _ in range(count):
             self.turn_on()
-            time.sleep(on_time)
+            deadline += on_time
+            time.sleep(max(0.0, deadline - time.monotonic()))
             self.turn_off()
             if _ < count - 1:  # Don't wait after the last blink
-                time.sleep(off_time)
+                deadline += off_time
+                time.sleep(max(0.0, deadline - time.monotonic()))
         return True
     
     def cleanup(self):
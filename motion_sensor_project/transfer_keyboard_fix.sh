@@ -10,6 +10,7 @@ LOCAL_PROJECT_DIR="/Users/nethmaison/dev/dillyJumpingDino/motion_sensor_project"
 # Files to transfer
 FILES=(
     "code/direct_keyboard_input.py"
+    "code/event_hub.py"
     "code/main_direct_keyboard.py"
     "code/test_direct_keyboard.py"
 )
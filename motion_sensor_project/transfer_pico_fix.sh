@@ -10,6 +10,8 @@ LOCAL_PROJECT_DIR="/Users/nethmaison/dev/dillyJumpingDino/motion_sensor_project"
 # Files to transfer
 FILES=(
     "code/pico_keyboard_input.py"
+    "code/direct_keyboard_input.py"
+    "code/event_hub.py"
     "code/test_pico_keyboard.py"
     "code/main_all_keyboards.py"
 )
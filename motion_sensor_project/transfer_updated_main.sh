@@ -11,6 +11,7 @@ LOCAL_PROJECT_DIR="/Users/nethmaison/dev/dillyJumpingDino/motion_sensor_project"
 FILES=(
     "code/main.py"
     "code/direct_keyboard_input.py"
+    "code/event_hub.py"
     "code/pico_keyboard_input.py"
 )
 